@@ -26,6 +26,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Start Vibe Coder application')
     parser.add_argument('-VibePay', action='store_true', help='Start in VibePay mode')
     parser.add_argument('--sudo', action='store_true', help='Try running printer with sudo (may require password)')
+    parser.add_argument('--production', action='store_true', help='Serve with gunicorn instead of the Flask development server')
     args = parser.parse_args()
     
     # Set environment variable for the payment mode
@@ -38,13 +39,22 @@ if __name__ == "__main__":
     # Change to the script's directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     
+    # Pick the server: gunicorn (one worker, threads for concurrency) or the dev server
+    if args.production:
+        port = os.getenv('PORT', '5002')
+        # Each open status stream holds a thread, so kiosks with several screens may need more
+        threads = os.getenv('GUNICORN_THREADS', '8')
+        command = f"gunicorn --workers 1 --threads {threads} --bind 0.0.0.0:{port} wsgi:app"
+    else:
+        command = "python3 src/main.py"
+    
     # Start the application
     if args.sudo:
         print("\nAttempting to run with sudo for printer permissions...")
         print("You may be prompted for your password.\n")
-        os.system("sudo python3 src/main.py")
+        os.system(f"sudo {command}")
     else:
         print("\nStarting without sudo permissions for printer...")
         print("If you see printer permission errors, try running with --sudo\n")
         time.sleep(1)  # Give user a moment to read the message
-        os.system("python3 src/main.py")
\ No newline at end of file
+        os.system(command)
\ No newline at end of file
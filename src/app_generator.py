@@ -1,5 +1,7 @@
 #!/usr/bin/env python3.11
 import os
+import json
+import shutil
 import uuid
 import string
 import random
@@ -9,7 +11,7 @@ import sys
 import time
 from dotenv import load_dotenv
 # Import thermal printer for iteration updates
-from thermal_printer import thermal_printer_manager
+from thermal_printer import thermal_printer_manager, queue_print
 
 # Fix import paths
 import os
@@ -19,11 +21,18 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # Import central configuration
-from config import GENERATED_APPS_DIR, GEMINI_API_KEY, GEMINI_MODELS, APP_TIERS, get_app_tier
+from config import GENERATED_APPS_DIR, GEMINI_API_KEY, GEMINI_MODELS, APP_TIERS, get_app_tier, calculate_iterations
 
 # Ensure generated apps directory exists
 os.makedirs(GENERATED_APPS_DIR, exist_ok=True)
 
+# Patterns used on every generation, compiled once
+CODE_BLOCK_RE = re.compile(r"```(?:html)?\n(.*?)\n```", re.DOTALL | re.IGNORECASE)  # Markdown code fence around the HTML
+README_TITLE_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)  # First markdown heading
+_TITLE_SUFFIX_RE = re.compile(r'\s+(Web\s+)?(App(lication)?|Project)$', re.IGNORECASE)
+_SLUG_INVALID_RE = re.compile(r'[^a-z0-9\-]')
+_SLUG_DASHES_RE = re.compile(r'\-+')
+
 # Configure the Gemini client
 model = None
 if not GEMINI_API_KEY:
@@ -63,19 +72,16 @@ def create_slug_from_title(title):
     Returns:
         A URL-friendly slug (e.g. "my-weather-app")
     """
-    import re
     # Convert to lowercase, replace spaces with dashes
     slug = title.lower().replace(' ', '-')
     # Remove special characters
-    slug = re.sub(r'[^a-z0-9\-]', '', slug)
+    slug = _SLUG_INVALID_RE.sub('', slug)
     # Remove multiple dashes
-    slug = re.sub(r'\-+', '-', slug)
+    slug = _SLUG_DASHES_RE.sub('-', slug)
     # Limit length to 50 characters
     slug = slug[:50].strip('-')
     # Add random characters if too short
     if len(slug) < 3:
-        import random
-        import string
         chars = ''.join(random.choices(string.ascii_lowercase + string.digits, k=5))
         slug = f"app-{chars}" if not slug else f"{slug}-{chars}"
     return slug
@@ -111,7 +117,7 @@ def generate_code_with_gemini(app_type: str, tier: str, readme_content: str) ->
         
         # Extract code block if necessary (sometimes LLMs add markdown)
         # Updated regex to optionally match 'html' after ```
-        code_match = re.search(r"```(?:html)?\n(.*?)\n```", response.text, re.DOTALL | re.IGNORECASE)
+        code_match = CODE_BLOCK_RE.search(response.text)
         if code_match:
             generated_code = code_match.group(1).strip()
         else:
@@ -213,9 +219,6 @@ def update_slug_mapping(app_id, slug):
         app_id: The unique ID of the app
         slug: The URL-friendly slug for the app
     """
-    import json
-    import os
-    
     # Skip if no slug provided
     if not slug:
         return
@@ -254,7 +257,6 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
     readme_path = os.path.join(app_dir, "README.md")
 
     # Determine tier and iterations based on amount
-    from config import calculate_iterations
     tier = get_app_tier(amount)
     iterations = calculate_iterations(amount, tier)
 
@@ -265,21 +267,20 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
         print(f"Failed to generate README.md for {app_type}. Aborting app generation.")
         # Clean up directory if README generation failed
         if os.path.exists(app_dir):
-            import shutil
             shutil.rmtree(app_dir)
         return None
         
     # Try to extract a title from the README
     app_title = app_type  # Default to app_type if we can't find a title
+    readme_title = None  # The heading exactly as written in the README
     try:
-        import re
         # Look for the first markdown heading (# Title)
-        title_match = re.search(r'^#\s+(.+)$', generated_readme, re.MULTILINE)
+        title_match = README_TITLE_RE.search(generated_readme)
         if title_match:
-            app_title = title_match.group(1).strip()
+            app_title = readme_title = title_match.group(1).strip()
             
             # Clean up the title if it contains "Web Application" or similar at the end
-            app_title = re.sub(r'\s+(Web\s+)?(App(lication)?|Project)$', '', app_title, flags=re.IGNORECASE)
+            app_title = _TITLE_SUFFIX_RE.sub('', app_title)
             
             # If the title doesn't include the app_type anywhere, add it to make searching easier
             if app_type.lower() not in app_title.lower() and len(app_title) < 40:
@@ -297,7 +298,6 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
         print(f"Failed to generate code from Gemini for {app_type} ({tier} tier) using the generated README.")
         # Clean up directory if code generation failed
         if os.path.exists(app_dir):
-            import shutil
             shutil.rmtree(app_dir)
         return None
 
@@ -310,6 +310,10 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
         
         with open(readme_path, "w", encoding="utf-8") as f:
             f.write(generated_readme)
+        
+        # Everything written to app_dir, by relative path, so the GitHub push
+        # can build its commit from memory instead of re-reading the directory
+        files = {"README.md": generated_readme}
 
         # Perform iterative improvements if applicable
         current_html = generated_html
@@ -323,7 +327,7 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
             os.makedirs(versions_dir, exist_ok=True)
             
             # Print initial receipt message about iterations
-            thermal_printer_manager.print_text([
+            queue_print(thermal_printer_manager.print_text, [
                 "GENERATING APP WITH ITERATIONS",
                 f"App ID: {app_id}",
                 f"Request: {app_type}",
@@ -335,6 +339,7 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
             # Save the initial version
             with open(os.path.join(versions_dir, "version_0.html"), "w", encoding="utf-8") as f:
                 f.write(current_html)
+            files["versions/version_0.html"] = current_html
             
             # Run through the requested number of iterations
             for i in range(1, iterations):
@@ -350,7 +355,7 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
                     focus_area = "Advanced features & polish"
                 
                 # Print iteration update to receipt
-                thermal_printer_manager.print_text([
+                queue_print(thermal_printer_manager.print_text, [
                     f"Iteration {i} of {iterations-1} starting...",
                     f"Enhancing app: {app_title}",
                     f"Focus: {focus_area}"
@@ -364,9 +369,10 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
                 # Save this iteration
                 with open(os.path.join(versions_dir, f"version_{i}.html"), "w", encoding="utf-8") as f:
                     f.write(improved_html)
+                files[f"versions/version_{i}.html"] = improved_html
                 
                 # Print iteration completion to receipt
-                thermal_printer_manager.print_text([
+                queue_print(thermal_printer_manager.print_text, [
                     f"Iteration {i} completed!",
                     "--------------------"
                 ], align='left', cut=False)
@@ -378,13 +384,14 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
         # Save the final HTML file
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(current_html)
+        files["index.html"] = current_html
         
         # Update slug mapping
         update_slug_mapping(app_id, app_slug)
         
         # Print completion message for iterations
         if iterations > 1:
-            thermal_printer_manager.print_text([
+            queue_print(thermal_printer_manager.print_text, [
                 "ALL ITERATIONS COMPLETE!",
                 f"App {app_id} successfully enhanced",
                 f"Total iterations performed: {iterations}",
@@ -398,6 +405,7 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
             "app_id": app_id,
             "app_type": app_type,
             "title": app_title,        # The extracted title from README
+            "readme_title": readme_title,  # Raw README heading, so callers needn't re-read the file
             "slug": app_slug,          # URL-friendly version of the title
             "amount": amount,
             "tier": tier,
@@ -405,14 +413,14 @@ def generate_app_files(app_type: str, amount: float) -> dict | None:
             "path": app_dir,           # Directory containing the generated app (index.html)
             "file_path": output_path,  # Specific path to the index.html file
             "readme_path": readme_path, # Path to the README.md file
-            "iteration_history": len(iteration_history)  # Number of versions saved
+            "iteration_history": len(iteration_history),  # Number of versions saved
+            "files": files             # Relative path -> content of every file written
         }
 
     except Exception as e:
         print(f"Error saving generated app {app_id} ({app_type}): {e}")
         # Clean up potentially partially created directory
         if os.path.exists(app_dir):
-            import shutil
             shutil.rmtree(app_dir)
         return None
 
@@ -433,7 +441,7 @@ def improve_app_iteratively(html_content, app_type, tier, iteration_num, total_i
     if not model:
         print("Gemini model not configured or configuration failed. Cannot improve app.")
         # Print error to receipt
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             f"ITERATION {iteration_num} ERROR:",
             "Gemini model not configured",
             "Using previous version"
@@ -466,7 +474,7 @@ def improve_app_iteratively(html_content, app_type, tier, iteration_num, total_i
         response = model_to_use.generate_content(prompt)
         
         # Extract code from response
-        code_match = re.search(r"```(?:html)?\n(.*?)\n```", response.text, re.DOTALL | re.IGNORECASE)
+        code_match = CODE_BLOCK_RE.search(response.text)
         if code_match:
             improved_code = code_match.group(1).strip()
         else:
@@ -477,7 +485,7 @@ def improve_app_iteratively(html_content, app_type, tier, iteration_num, total_i
         if not improved_code.lower().startswith("<!doctype html") and not improved_code.lower().startswith("<html"):
             print(f"Warning: Improved code doesn't look like HTML. Using previous version.")
             # Print warning to receipt
-            thermal_printer_manager.print_text([
+            queue_print(thermal_printer_manager.print_text, [
                 f"ITERATION {iteration_num} WARNING:",
                 "Generated code is not valid HTML",
                 "Using previous version"
@@ -493,7 +501,7 @@ def improve_app_iteratively(html_content, app_type, tier, iteration_num, total_i
         size_change = f"{'+' if size_diff > 0 else ''}{size_diff} bytes"
         
         # Print success to receipt with some basic stats
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             f"Iteration {iteration_num} successful:",
             f"Code size change: {size_change}",
             f"Enhancements applied!"
@@ -509,7 +517,7 @@ def improve_app_iteratively(html_content, app_type, tier, iteration_num, total_i
             print(f"Response text starts with: {response_var.text[:100]}...")
         
         # Print error to receipt
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             f"ITERATION {iteration_num} ERROR:",
             f"{str(e)[:40]}...",
             "Using previous version"
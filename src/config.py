@@ -20,6 +20,14 @@ EXTERNAL_HOST = os.getenv("EXTERNAL_HOST", None)  # External URL for accessing t
 # Get the absolute path of the directory containing this script
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 GENERATED_APPS_DIR = os.path.abspath(os.path.join(_SCRIPT_DIR, "generated_apps"))
+# Browser cache lifetime for generated app files (they don't change once generated)
+GENERATED_APP_CACHE_SECONDS = 86400
+# Lifetime for files addressed by app ID, which can never point at different content
+GENERATED_APP_IMMUTABLE_SECONDS = 31536000
+# When set, generated app files are handed to nginx via X-Accel-Redirect under this
+# internal location instead of being read by Python, e.g. with "/internal/apps/":
+#   location /internal/apps/ { internal; alias /path/to/src/generated_apps/; }
+APPS_ACCEL_REDIRECT_PREFIX = os.getenv("APPS_ACCEL_REDIRECT_PREFIX", None)
 
 # --- API Keys ---
 GITHUB_PAT = os.getenv("GITHUB_PAT")
@@ -27,6 +35,8 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # --- Logging Configuration ---
 LOG_LEVEL = logging.INFO if not DEBUG else logging.DEBUG
+# Lowest level kept by the in-app log (debug, info, warning, error); lower levels are skipped unformatted
+MIN_LOG_LEVEL = os.getenv("MIN_LOG_LEVEL", "debug").lower()
 LOGGER_CONFIG = {
     "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     "level": LOG_LEVEL,
@@ -4,13 +4,25 @@ GitHub integration service for Vibe Coder application.
 This module handles repository creation and code pushing.
 """
 import os
+import re
 import time
 import subprocess
 import shutil
 import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional, Any
 
+# pygit2 is optional: without it pushes fall back to the git command line
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 # Fix import paths
 import os
 import sys
@@ -59,6 +71,97 @@ except ImportError:
 # Set up logging
 logger = logging.getLogger("github_service")
 
+# Characters not allowed in generated repository names
+_REPO_NAME_INVALID_RE = re.compile(r'[^a-zA-Z0-9\-\_]')
+
+# Creates repositories on GitHub while the local commit is being prepared
+_REPO_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="github-api")
+
+def _run_git(args, cwd, check=True):
+    """
+    Run a git command without capturing its output; stderr is piped and only
+    decoded if the command fails.
+    
+    Args:
+        args: Arguments after "git"
+        cwd: Repository directory
+        check: Raise on a non-zero exit status
+        
+    Returns:
+        The completed process
+        
+    Raises:
+        subprocess.CalledProcessError: If check is set and the command fails
+    """
+    result = subprocess.run(["git", *args], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if check and result.returncode != 0:
+        raise subprocess.CalledProcessError(
+            result.returncode, result.args, stderr=result.stderr.decode("utf-8", "replace")
+        )
+    return result
+
+# Timeout in seconds for GitHub API calls
+GITHUB_API_TIMEOUT = 10
+
+# Most URLs whose ETag and body conditional_get keeps; the least recently used go first
+_ETAG_CACHE_SIZE = 64
+
+def _build_github_session(github_pat):
+    """
+    Create a pooled HTTP session for the GitHub API.
+    
+    Args:
+        github_pat: GitHub Personal Access Token sent with every request
+        
+    Returns:
+        requests.Session with auth headers and retrying adapter mounted
+    """
+    session = requests.Session()
+    session.headers.update({
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    })
+    if github_pat:
+        session.headers["Authorization"] = f"token {github_pat}"
+    
+    # Keep connections to api.github.com alive between calls; retry gateway errors
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
+    return session
+
+# Text push_to_github puts in the URL it returns when the push failed
+_PUSH_ERROR_MARKERS = ("Error:", "(Repo not found", "(Permission denied", "pat-not-set")
+
+def push_succeeded(github_url):
+    """
+    Check whether a URL returned by push_to_github points at a pushed repository.
+    
+    Args:
+        github_url: The URL returned by push_to_github
+        
+    Returns:
+        True if the push succeeded, False otherwise
+    """
+    return bool(github_url) and not any(marker in github_url for marker in _PUSH_ERROR_MARKERS)
+
+def wait_for_push(github_future):
+    """
+    Wait for a push_to_github call submitted to an executor and return its URL.
+    The executor thread has no app context, so errors there can't become a response;
+    a failed push must not stop the receipt and UI update for an app that is already hosted.
+    
+    Args:
+        github_future: Future of the push_to_github call
+        
+    Returns:
+        The repository URL, or None if the push raised
+    """
+    try:
+        return github_future.result()
+    except Exception as e:
+        logger.error(f"GitHub push failed: {e}")
+        return None
+
 class GitHubService:
     """Service class for handling GitHub repository operations."""
     
@@ -73,11 +176,58 @@ class GitHubService:
         self.github_pat = github_pat or GITHUB_PAT
         self.username = username or GITHUB_CONFIG["username"]
         self.repo_prefix = GITHUB_CONFIG["repo_prefix"]
+        self.session = _build_github_session(self.github_pat)
+        
+        # url -> (ETag, parsed body) for conditional GETs, least recently used first
+        self._etag_cache = OrderedDict()
+        self._etag_lock = threading.Lock()
         
         # Log warning if PAT not set
         if not self.github_pat:
             logger.warning("GitHub PAT not set. GitHub integration will likely fail.")
     
+    def conditional_get(self, url: str):
+        """
+        GET a GitHub API URL, revalidating cached responses with their ETag.
+        
+        A 304 reply does not count against the rate limit, so repeated
+        lookups of the same resource are effectively free.
+        
+        Args:
+            url: Full API URL to fetch
+            
+        Returns:
+            Tuple of (status code, parsed JSON body or None, response)
+            
+        Raises:
+            requests.RequestException: If the request itself fails
+        """
+        with self._etag_lock:
+            cached = self._etag_cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = self.session.get(url, headers=headers, timeout=GITHUB_API_TIMEOUT)
+        
+        if response.status_code == 304 and cached:
+            with self._etag_lock:
+                if url in self._etag_cache:
+                    self._etag_cache.move_to_end(url)
+            return 200, cached[1], response
+        
+        if response.status_code == 200:
+            body = response.json()
+            etag = response.headers.get("ETag")
+            if etag:
+                with self._etag_lock:
+                    self._etag_cache[url] = (etag, body)
+                    self._etag_cache.move_to_end(url)
+                    if len(self._etag_cache) > _ETAG_CACHE_SIZE:
+                        self._etag_cache.popitem(last=False)
+            return 200, body, response
+        
+        with self._etag_lock:
+            self._etag_cache.pop(url, None)
+        return response.status_code, None, response
+    
     @exception_handler
     def create_repository(self, repo_name: str) -> bool:
         """
@@ -102,12 +252,6 @@ class GitHubService:
         # Log creation attempt
         logger.info(f"Creating repository: {repo_name} for user: {self.username}")
         
-        # Set up the authorization headers
-        headers = {
-            "Authorization": f"token {self.github_pat}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
         # Repository data
         data = {
             "name": repo_name,
@@ -121,7 +265,7 @@ class GitHubService:
         
         try:
             # Create repository using GitHub API
-            response = requests.post(GITHUB_CONFIG["create_repo_api"], headers=headers, json=data)
+            response = self.session.post(GITHUB_CONFIG["create_repo_api"], json=data, timeout=GITHUB_API_TIMEOUT)
             
             # Check response
             if response.status_code == 201:
@@ -158,7 +302,7 @@ class GitHubService:
             )
     
     @exception_handler
-    def push_to_github(self, app_path: str, app_id: str, app_type: str, title: str = None, slug: str = None) -> str:
+    def push_to_github(self, app_path: str, app_id: str, app_type: str, title: str = None, slug: str = None, files: Optional[Dict[str, Any]] = None) -> str:
         """
         Push the generated app code to a GitHub repository.
         
@@ -168,6 +312,8 @@ class GitHubService:
             app_type: Type of app being pushed
             title: Optional title for the app (for repo name)
             slug: Optional URL-friendly slug for the repo name
+            files: Optional relative path -> content of the app's files, as returned by
+                generate_app_files; with pygit2 the commit is built from these directly
             
         Returns:
             Repository URL if successful, error message otherwise
@@ -177,7 +323,7 @@ class GitHubService:
         """
         if not self.github_pat:
             return "https://github.com/error/pat-not-set"
-            
+        
         # Generate repository name from slug if available, otherwise use app_id
         if slug:
             repo_name = f"{self.repo_prefix}-{slug}"
@@ -185,8 +331,7 @@ class GitHubService:
             repo_name = f"{self.repo_prefix}{app_id}"
             
         # Ensure repo name is valid (max 100 chars, no special chars)
-        import re
-        repo_name = re.sub(r'[^a-zA-Z0-9\-\_]', '', repo_name)[:100]
+        repo_name = _REPO_NAME_INVALID_RE.sub('', repo_name)[:100]
         
         repo_url = f"https://github.com/{self.username}/{repo_name}"
         git_url = f"{repo_url}.git"
@@ -201,12 +346,8 @@ class GitHubService:
         logger.info(f"Attempting to push code from {app_path} to {repo_url}")
         logger.info(f"Using account: {self.username}")
         
-        # First create the repository
-        try:
-            repo_created = self.create_repository(repo_name)
-        except GitHubError as e:
-            logger.warning(f"Could not create repository {repo_name}. Will attempt to push anyway: {e.message}")
-            # Continue with the push attempt even if repo creation failed
+        # Create the repository in the background; only the push has to wait for it
+        repo_future = _REPO_EXECUTOR.submit(self.create_repository, repo_name)
         
         git_dir = os.path.join(app_path, ".git")
         
@@ -215,12 +356,17 @@ class GitHubService:
             if os.path.exists(git_dir):
                 logger.info("Removing existing .git directory.")
                 shutil.rmtree(git_dir)
-                time.sleep(0.5)  # Small delay to ensure directory is removed
+                if pygit2 is None:
+                    time.sleep(0.5)  # Small delay to ensure directory is removed
+            
+            # Commit and push in-process when libgit2 is available
+            if pygit2 is not None:
+                return self._push_with_pygit2(app_path, app_id, repo_name, repo_url, git_url, commit_message, repo_future, files)
                 
             # Initialize git repo
             logger.info("Initializing git repository...")
             try:
-                subprocess.run(["git", "init"], cwd=app_path, check=True, capture_output=True, text=True)
+                _run_git(["init"], app_path)
             except subprocess.CalledProcessError as e:
                 log_and_raise(
                     GitHubError,
@@ -231,13 +377,13 @@ class GitHubService:
                 )
             
             # Configure git user (temporary for this repo)
-            subprocess.run(["git", "config", "user.name", "Vibe Coder Bot"], cwd=app_path, check=True)
-            subprocess.run(["git", "config", "user.email", "noreply@vibe.coder"], cwd=app_path, check=True)
+            _run_git(["config", "user.name", "Vibe Coder Bot"], app_path)
+            _run_git(["config", "user.email", "noreply@vibe.coder"], app_path)
             
             # Add files
             logger.info("Adding files...")
             try:
-                subprocess.run(["git", "add", "."], cwd=app_path, check=True, capture_output=True, text=True)
+                _run_git(["add", "."], app_path)
             except subprocess.CalledProcessError as e:
                 log_and_raise(
                     GitHubError,
@@ -263,7 +409,7 @@ class GitHubService:
                     with open(os.path.join(app_path, "README.md"), "a") as f:
                         f.write("\n\nGenerated at: " + time.strftime("%Y-%m-%d %H:%M:%S"))
                     
-                    subprocess.run(["git", "add", "README.md"], cwd=app_path, check=True, capture_output=True, text=True)
+                    _run_git(["add", "README.md"], app_path)
                     
                     commit_retry = subprocess.run(
                         ["git", "commit", "-m", commit_message], 
@@ -297,21 +443,15 @@ class GitHubService:
                     )
                     
             # Rename branch to main
-            subprocess.run(["git", "branch", "-M", "main"], cwd=app_path, check=True, capture_output=True, text=True)
+            _run_git(["branch", "-M", "main"], app_path)
             
             # Add remote origin
             logger.info(f"Adding remote origin: {git_url}")
             # Remove existing remote origin if it exists to avoid error
-            subprocess.run(["git", "remote", "remove", "origin"], cwd=app_path, check=False, capture_output=True, text=True)
+            _run_git(["remote", "remove", "origin"], app_path, check=False)
             
             try:
-                subprocess.run(
-                    ["git", "remote", "add", "origin", authenticated_repo_url], 
-                    cwd=app_path, 
-                    check=True, 
-                    capture_output=True, 
-                    text=True
-                )
+                _run_git(["remote", "add", "origin", authenticated_repo_url], app_path)
             except subprocess.CalledProcessError as e:
                 log_and_raise(
                     GitHubError,
@@ -322,6 +462,7 @@ class GitHubService:
                 )
             
             # Push to GitHub
+            self._wait_for_repository(repo_future, repo_name)
             logger.info("Pushing to GitHub...")
             push_result = subprocess.run(
                 ["git", "push", "-u", "origin", "main"], 
@@ -375,6 +516,111 @@ class GitHubService:
                 except Exception as e:
                     logger.warning(f"Failed to clean up .git directory: {e}")
                     
+    def _wait_for_repository(self, repo_future, repo_name: str) -> None:
+        """
+        Wait for the background repository creation before pushing.
+        
+        Args:
+            repo_future: Future returned by submitting create_repository
+            repo_name: Name of the repository being created
+        """
+        try:
+            repo_future.result()
+        except Exception as e:
+            # Continue with the push attempt even if repo creation failed
+            logger.warning(f"Could not create repository {repo_name}. Will attempt to push anyway: {getattr(e, 'message', e)}")
+    
+    def _write_tree(self, repo, files: Dict[str, Any]):
+        """
+        Write in-memory files as blobs and build a git tree from them.
+        
+        Args:
+            repo: pygit2 repository to write the objects into
+            files: Relative path ("versions/version_0.html") -> str or bytes content
+            
+        Returns:
+            Oid of the tree
+        """
+        builder = repo.TreeBuilder()
+        subdirs = {}
+        for path, content in files.items():
+            name, _, rest = path.partition("/")
+            if rest:
+                subdirs.setdefault(name, {})[rest] = content
+            else:
+                data = content.encode("utf-8") if isinstance(content, str) else content
+                builder.insert(name, repo.create_blob(data), pygit2.GIT_FILEMODE_BLOB)
+        for name, subdir_files in subdirs.items():
+            builder.insert(name, self._write_tree(repo, subdir_files), pygit2.GIT_FILEMODE_TREE)
+        return builder.write()
+    
+    def _push_with_pygit2(self, app_path: str, app_id: str, repo_name: str, repo_url: str, git_url: str, commit_message: str, repo_future, files: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Commit the app directory and push it to GitHub using libgit2.
+        
+        Args:
+            app_path: Local path to the app code
+            app_id: Unique ID for the app
+            repo_name: Name of the repository
+            repo_url: Public URL of the repository
+            git_url: Remote URL to push to
+            commit_message: Message for the single commit
+            repo_future: Future of the repository creation, awaited before the push
+            files: Optional relative path -> content to commit instead of scanning app_path
+            
+        Returns:
+            Repository URL if successful, error message otherwise
+            
+        Raises:
+            GitHubError: If the commit or push fails
+        """
+        logger.info("Initializing git repository...")
+        repo = pygit2.init_repository(app_path, initial_head="main")
+        
+        logger.info("Adding files...")
+        if files:
+            # The generator's output is already in memory: write it straight to blobs
+            tree = self._write_tree(repo, files)
+        else:
+            # Stage everything and write the tree from the in-memory index
+            index = repo.index
+            index.add_all()
+            index.write()
+            tree = index.write_tree()
+        
+        # libgit2 commits an empty tree too, so no README padding is needed
+        logger.info("Committing files...")
+        signature = pygit2.Signature("Vibe Coder Bot", "noreply@vibe.coder")
+        repo.create_commit("HEAD", signature, signature, commit_message, tree, [])
+        
+        # Credentials go through the callbacks instead of the remote URL
+        logger.info(f"Adding remote origin: {git_url}")
+        remote = repo.remotes.create("origin", git_url)
+        callbacks = pygit2.RemoteCallbacks(credentials=pygit2.UserPass(self.username, self.github_pat))
+        
+        self._wait_for_repository(repo_future, repo_name)
+        logger.info("Pushing to GitHub...")
+        try:
+            remote.push(["refs/heads/main"], callbacks=callbacks)
+        except pygit2.GitError as e:
+            message = str(e).lower()
+            if "not found" in message:
+                logger.error(f"Repository {repo_url} not found. Please verify the GitHub account and token.")
+                return f"{repo_url} (Repo not found - please verify account permissions)"
+            elif "403" in message or "denied" in message:
+                logger.error(f"Permission denied. Please verify the GitHub token has correct permissions.")
+                return f"{repo_url} (Permission denied - check token permissions)"
+            log_and_raise(
+                GitHubError,
+                "Failed to push to GitHub",
+                code=ErrorCodes.GIT_COMMAND_ERROR,
+                details={'command': 'push', 'stderr': str(e)},
+                original_exception=e
+            )
+        
+        logger.info(f"Successfully pushed {app_id} to {repo_url}")
+        return repo_url
+                    
     def test_connection(self) -> Dict:
         """
         Test GitHub API connection and token validity.
@@ -389,16 +635,10 @@ class GitHubService:
             }
             
         try:
-            # Check the user endpoint to test authentication
-            headers = {
-                "Authorization": f"token {self.github_pat}",
-                "Accept": "application/vnd.github.v3+json"
-            }
-            
-            response = requests.get("https://api.github.com/user", headers=headers)
+            # Check the user endpoint to test authentication; repeat checks revalidate with the ETag
+            status, user_data, response = self.conditional_get("https://api.github.com/user")
             
-            if response.status_code == 200:
-                user_data = response.json()
+            if status == 200:
                 return {
                     "status": "ok",
                     "username": user_data.get("login"),
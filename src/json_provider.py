@@ -0,0 +1,62 @@
+#!/usr/bin/env python3.11
+"""
+JSON provider for Vibe Coder application.
+This module swaps Flask's JSON encoder for orjson when it is installed.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is optional: without it Flask's default provider stays in place
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes responses with orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode("utf-8")
+
+    def dumps_bytes(self, obj):
+        """Serialize to UTF-8 bytes, which is what orjson produces natively."""
+        return orjson.dumps(obj, default=self.default)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of decoding
+        # them to str for Flask to encode again
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def json_bytes(app, obj):
+    """
+    Serialize an object with the app's JSON provider and return UTF-8 bytes.
+
+    Args:
+        app: The Flask application
+        obj: The object to serialize
+
+    Returns:
+        The JSON document as bytes
+    """
+    if isinstance(app.json, ORJSONProvider):
+        return app.json.dumps_bytes(obj)
+    return app.json.dumps(obj).encode("utf-8")
+
+def install_json_provider(app):
+    """
+    Use orjson for jsonify and JSON request parsing on a Flask app, if available.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        True if the orjson provider was installed, False otherwise
+    """
+    if orjson is None:
+        return False
+    app.json = ORJSONProvider(app)
+    return True
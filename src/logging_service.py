@@ -3,62 +3,102 @@
 Logging service for Vibe Coder application.
 This module provides functionality for logging messages to memory and console.
 """
+import re
 import time
 import logging
+import itertools
+import threading
+from collections import deque
 from typing import Dict, List, Any, Optional
 
-# Import error handling
-from src.error_handling import exception_handler
+# Import error handling; main.py imports this module with src/ itself on sys.path,
+# so use the same module names as it does and fall back to the package names
+try:
+    from error_handling import exception_handler
+    from config import MIN_LOG_LEVEL
+except ImportError:
+    from src.error_handling import exception_handler
+    from src.config import MIN_LOG_LEVEL
+
+# Server noise kept out of the display logs (debugger banner, HTTP access lines, status polls)
+LOG_NOISE_RE = re.compile(r"debugger|pin:|http/1\.1|api/email-status", re.IGNORECASE)
+
+# Level names accepted by add_log, and the lowest level that is recorded
+_LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR
+}
+_MIN_LOG_LEVEL = _LOG_LEVELS.get(MIN_LOG_LEVEL, logging.DEBUG)
+
+def enabled_log_level(level: str) -> Optional[int]:
+    """
+    Look up the logging level number for an add_log level name, if that level is recorded.
+    Unknown names count as info.
+    
+    Args:
+        level: Log level name (info, warning, error, debug)
+        
+    Returns:
+        The logging level number, or None if the level is below MIN_LOG_LEVEL
+    """
+    level_no = _LOG_LEVELS.get(level, logging.INFO)
+    return level_no if level_no >= _MIN_LOG_LEVEL else None
 
 class LoggingService:
     """Service class for handling application logs."""
     
     def __init__(self):
         """Initialize the logging service."""
-        self.application_logs = []  # Store logs in memory
-        self.log_id_counter = 0  # Counter for log IDs
+        self.application_logs = deque(maxlen=1000)  # Store logs in memory (oldest dropped when full)
+        self._log_ids = itertools.count(1)  # Source of log IDs
+        self._lock = threading.Lock()  # Guards ID assignment + append
+        self.display_logs = deque(maxlen=16)  # Recent entries without server noise
         
         # Configure logger
         self.logger = logging.getLogger(__name__)
     
     @exception_handler
-    def add_log(self, message: str, level: str = "info") -> Dict[str, Any]:
+    def add_log(self, message: str, level: str = "info", *args: Any) -> Optional[Dict[str, Any]]:
         """
         Add a log entry to the application logs.
         
         Args:
-            message: The log message text
+            message: The log message text; %-formatted with args, only if the level is enabled
             level: Log level (info, warning, error, debug)
+            *args: Values for the %-placeholders in message
             
         Returns:
-            Dictionary containing the log entry
+            Dictionary containing the log entry, or None if the level is below MIN_LOG_LEVEL
         """
-        self.log_id_counter += 1
-        
+        level_no = enabled_log_level(level)
+        if level_no is None:
+            return None
+        if args:
+            message = message % args
+            
         log_entry = {
-            "id": self.log_id_counter,
             "timestamp": time.time(),
             "message": message,
             "level": level
         }
         
-        # Add to in-memory log store (limit to 1000 entries)
-        self.application_logs.append(log_entry)
-        if len(self.application_logs) > 1000:
-            self.application_logs.pop(0)  # Remove oldest log
+        # Filter once here so readers of the display logs never rescan the store
+        is_noise = LOG_NOISE_RE.search(message) is not None
+        
+        # Add to in-memory log store (bounded to 1000 entries by the deque)
+        with self._lock:
+            log_entry["id"] = next(self._log_ids)
+            self.application_logs.append(log_entry)
+            if not is_noise:
+                self.display_logs.append(log_entry)
             
         # Also print to console
         print(f"[{level.upper()}] {message}")
         
         # Log to the appropriate logger level
-        if level == "info":
-            self.logger.info(message)
-        elif level == "warning":
-            self.logger.warning(message)
-        elif level == "error":
-            self.logger.error(message)
-        elif level == "debug":
-            self.logger.debug(message)
+        self.logger.log(level_no, message)
             
         return log_entry
     
@@ -73,21 +113,40 @@ class LoggingService:
         Returns:
             List of log entries
         """
-        # Filter by level if specified
-        if level:
-            filtered_logs = [log for log in self.application_logs if log["level"] == level]
-        else:
-            filtered_logs = self.application_logs.copy()
-            
-        # Apply limit if specified
-        if limit and limit > 0:
-            filtered_logs = filtered_logs[-limit:]
+        # Walk the deque newest first so a limit stops the scan early instead of
+        # copying all 1000 entries; the lock keeps add_log from mutating it mid-walk
+        with self._lock:
+            newest_first = reversed(self.application_logs)
+            if level:
+                newest_first = (log for log in newest_first if log["level"] == level)
+            if limit and limit > 0:
+                newest_first = itertools.islice(newest_first, limit)
+            filtered_logs = list(newest_first)
             
+        filtered_logs.reverse()
         return filtered_logs
     
+    def get_display_logs(self, limit: int = 8) -> List[Dict[str, Any]]:
+        """
+        Get the most recent log entries, skipping server noise (debugger, HTTP access, status polls).
+        
+        Args:
+            limit: Maximum number of logs to return (at most 16 are kept)
+            
+        Returns:
+            List of log entries, oldest first
+        """
+        if limit <= 0:
+            return []
+        with self._lock:
+            recent = list(itertools.islice(reversed(self.display_logs), limit))
+        recent.reverse()
+        return recent
+    
     def clear_logs(self) -> None:
         """Clear all logs from memory."""
-        self.application_logs = []
+        self.application_logs.clear()
+        self.display_logs.clear()
         self.logger.info("Logs cleared from memory")
     
     def setup_custom_logger(self, name: str) -> logging.Logger:
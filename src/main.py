@@ -7,53 +7,76 @@ import os
 import sys
 import time
 import logging
-from flask import Flask, request, jsonify, send_from_directory, url_for, render_template, redirect
-import qrcode
-import io
+import logging.handlers
+import queue
+import atexit
+from flask import Flask, Response, request, jsonify, send_from_directory, url_for, render_template, redirect
 import base64
 import subprocess
 import shutil
 import uuid
 import threading
-import socket
+import concurrent.futures
+import itertools
+import functools
+import contextlib
+import json
+import re
+from werkzeug.security import safe_join
+from flask.sessions import SecureCookieSessionInterface
+from collections import deque
+from typing import Dict, Any, Optional
 
 # Import helper modules
-import sys
-import os
-
 # Add the current directory to the path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # Now import with relative paths
-from thermal_printer import thermal_printer_manager
+from thermal_printer import thermal_printer_manager, queue_print
 from venmo_email import email_processor, init_email_monitoring
 from venmo_qr import venmo_qr_manager
 from venmo_config import VENMO_CONFIG, EMAIL_CONFIG
-from config import PRINTER_CONFIG, get_app_tier, calculate_iterations  # Import config and tier/iteration functions
-from github_service import github_service
+from config import PRINTER_CONFIG, DEBUG, HOST, PORT, EXTERNAL_HOST, GENERATED_APP_CACHE_SECONDS, GENERATED_APP_IMMUTABLE_SECONDS, APPS_ACCEL_REDIRECT_PREFIX, get_app_tier, calculate_iterations  # Import config and tier/iteration functions
+from github_service import github_service, push_succeeded, wait_for_push
 from app_generator import generate_app_files
 from receipt_manager import receipt_manager  # Import the new receipt manager
+from json_provider import install_json_provider, json_bytes
+from logging_service import enabled_log_level
+from qr_png import qr_matrix_to_png, qr_modules
+from network import get_local_ip, build_external_host
 
-# Helper function to get local IP address
-def get_local_ip():
-    """Get the local IP address of this machine for network connections."""
-    try:
-        # Get the local IP by creating a socket connection to an external server
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        # The address doesn't need to be reachable
-        s.connect(('8.8.8.8', 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return "localhost"
+class StaticRequestFilteringSessionInterface(SecureCookieSessionInterface):
+    """
+    Cookie sessions, except for generated apps and their QR codes, the landing page
+    and the status polls: those never touch the session, so they skip loading and saving it.
+    """
+    _EXCLUDED_PREFIXES = ("/apps/", "/api/app-qr/", "/api/email-status", "/api/generation-status/")
+
+    def _is_excluded(self, request):
+        return request.path == "/" or request.path.startswith(self._EXCLUDED_PREFIXES)
+
+    def open_session(self, app, request):
+        if self._is_excluded(request):
+            return self.make_null_session(app)
+        return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if self.is_null_session(session):
+            return
+        return super().save_session(app, session, response)
 
 # --- App Initialization ---
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 app = Flask(__name__, static_folder="static", static_url_path="", template_folder="templates")
+install_json_provider(app)  # orjson for JSON responses when installed
+app.session_interface = StaticRequestFilteringSessionInterface()
 GENERATED_APPS_DIR = os.path.abspath(os.path.join(_SCRIPT_DIR, "generated_apps"))
+_SLUG_MAPPING_FILE = os.path.join(GENERATED_APPS_DIR, "slug_mapping.json")
+# App IDs and slugs are letters, digits and dashes only, so a valid name joined
+# onto GENERATED_APPS_DIR can never point outside it
+_APP_ID_RE = re.compile(r"\A[A-Za-z0-9-]+\Z")
 
 # Payment mode configuration
 PAYMENT_MODE = {
@@ -69,94 +92,240 @@ PAYMENT_MODE = {
     }
 }
 
-# Initialize the thermal printer - test connection by trying to print a blank line
+# Resolve the local IP once at startup; the full VibePay URL never changes while
+# the server is running, so there is no need to probe the network per receipt.
+_LOCAL_IP = get_local_ip()
+VIBEPAY_FULL_URL = f"http://{_LOCAL_IP}:{PORT}{PAYMENT_MODE['vibepay']['url']}"
+
+_EXTERNAL_HOST = build_external_host(EXTERNAL_HOST, _LOCAL_IP, PORT)
+
+# Full payment URL (as printed in the receipt QR code) for each payment mode
+_PAYMENT_URLS = {
+    # Use the app URL so the QR code opens the Venmo app directly
+    "venmo": PAYMENT_MODE["venmo"].get("app_url", PAYMENT_MODE["venmo"]["url"]),
+    "vibepay": VIBEPAY_FULL_URL
+}
+
+def get_payment_url(mode):
+    """Return the full payment URL (as printed in the receipt QR code) for a payment mode."""
+    return _PAYMENT_URLS[mode]
+
+# Initialize the thermal printer - open the shared USB connection up front
 def init_thermal_printer():
-    """Test printer connection by printing a blank line. Returns True if successful."""
-    # Try to print a blank line to test printer connection
-    return thermal_printer_manager.print_text("")
+    """Open the printer connection before the first receipt. Returns True if successful."""
+    return thermal_printer_manager.connect()
 
 # --- QR Code Generation --- 
-def generate_qr_code_base64(url: str) -> str:
-    """Generates a QR code for the given URL and returns it as a base64 encoded PNG image."""
+_QR_BOX_SIZE = 5  # The browser scales the image up; fewer pixels = less PNG work
+
+@functools.lru_cache(maxsize=256)
+def _render_qr_png(url: str) -> bytes:
+    """
+    Render the QR code PNG for a URL.
+    Results are cached per URL since app QR codes are fetched again on every page load;
+    the cache is large enough that per-app URLs don't push the payment codes out.
+    Errors propagate, so a failed render is never cached.
+    """
+    return qr_matrix_to_png(qr_modules(url), _QR_BOX_SIZE, border=4)
+
+def generate_qr_code_png(url: str) -> bytes:
+    """
+    Generates a QR code for the given URL and returns the PNG bytes.
+    Returns empty bytes if the code can't be generated; the next call retries.
+    """
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-        return img_base64
+        return _render_qr_png(url)
     except Exception as e:
         print(f"Error generating QR code for {url}: {e}")
-        return ""
+        return b""
+
+def generate_qr_code_base64(url: str) -> str:
+    """
+    Generates a QR code for the given URL and returns it as a base64 encoded PNG image.
+    Returns an empty string if the code can't be generated; the next call retries.
+    """
+    return base64.b64encode(generate_qr_code_png(url)).decode("ascii")
+
+# Rendered payment QR codes by mode, read by the polled /api/email-status endpoint
+_QR_CACHE = {}
+
+def _refresh_qr_cache():
+    """Render the QR code for each payment mode's URL into _QR_CACHE."""
+    for mode in _PAYMENT_URLS:
+        _QR_CACHE[mode] = generate_qr_code_base64(_PAYMENT_URLS[mode])
+
+def _payment_qr_code(mode):
+    """Return the cached QR code for a payment mode, re-rendering it if the last attempt failed."""
+    qr_code = _QR_CACHE.get(mode)
+    if not qr_code:
+        qr_code = _QR_CACHE[mode] = generate_qr_code_base64(_PAYMENT_URLS[mode])
+    return qr_code
 
 # --- Logging System for Display ---
-# Store logs in memory for display
-application_logs = []
-log_id_counter = 0
+# Store logs in memory for display. The deque drops the oldest entry on its own
+# once full, and itertools.count hands out IDs without a global read-modify-write,
+# so add_log can be called from request threads and the email thread alike.
+application_logs = deque(maxlen=1000)
+_log_ids = itertools.count(1)
+_LOG_LOCK = threading.Lock()  # Keeps entries in the deque ordered by ID
+
+# Console output goes through a QueueHandler so callers only enqueue the record;
+# a QueueListener thread does the actual (stdout-locking) write
+_log_queue = queue.SimpleQueue()
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("[%(vibe_level)s] %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _console_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # Flush queued lines on shutdown
 
-# Generation cooldown mechanism to prevent multiple apps being generated at once
+vibe_logger = logging.getLogger("vibe")
+vibe_logger.setLevel(logging.DEBUG)
+vibe_logger.propagate = False  # Console output is handled by the listener only
+vibe_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+# Generation cooldown mechanism to prevent multiple apps being generated at once.
+# The state is shared by request threads and the email thread, so every read and
+# write goes through _GENERATION_STATE_LOCK. Times are time.monotonic() values.
 GENERATION_LOCK = {
     "is_generating": False,
-    "last_generation_time": 0,
+    "last_generation_time": float("-inf"),
     "cooldown_seconds": 15  # Time to wait between generations
 }
+_GENERATION_STATE_LOCK = threading.Lock()
 
-def add_log(message, level="info"):
-    """Add a log entry to the application logs."""
-    global log_id_counter
-    log_id_counter += 1
-    
+# Set while a new generation is allowed. Cleared by start_generation and set
+# again by a timer once the cooldown after end_generation has passed, so
+# waiters can block on it instead of re-polling the state above.
+_gen_free = threading.Event()
+_gen_free.set()
+_gen_timer = None  # Pending cooldown timer, guarded by _GENERATION_STATE_LOCK
+
+# Background worker for VibePay generations so the request returns immediately.
+# One worker is enough: the generation lock only ever admits one job at a time.
+_GEN_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gen")
+# job_id -> Future of each VibePay generation (oldest first), for /api/generation-status/<job_id>
+_GENERATION_JOBS = {}
+_GENERATION_JOBS_LOCK = threading.Lock()
+_MAX_GENERATION_JOBS = 50  # Finished jobs beyond this are forgotten
+
+# The GitHub push runs here while the generation thread renders the app's QR code
+_PUSH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="github")
+
+def add_log(message, level="info", *args):
+    """
+    Add a log entry to the application logs.
+    Extra args are %-formatted into the message, only when the level is enabled:
+    add_log("Payment of $%.2f for '%s'", "info", amount, note)
+    Returns the log entry, or None if the level is below MIN_LOG_LEVEL.
+    """
+    level_no = enabled_log_level(level)
+    if level_no is None:
+        return None
+    if args:
+        message = message % args
+        
     log_entry = {
-        "id": log_id_counter,
         "timestamp": time.time(),
         "message": message,
         "level": level
     }
     
-    # Add to in-memory log store (limit to 1000 entries)
-    application_logs.append(log_entry)
-    if len(application_logs) > 1000:
-        application_logs.pop(0)  # Remove oldest log
+    # Add to in-memory log store (bounded to 1000 entries by the deque)
+    with _LOG_LOCK:
+        log_entry["id"] = next(_log_ids)
+        application_logs.append(log_entry)
         
-    # Also print to console
-    print(f"[{level.upper()}] {message}")
+    # Also log to console (written by the listener thread)
+    vibe_logger.log(level_no, message, extra={"vibe_level": level.upper()})
     
     return log_entry
 
-def can_generate_new_app():
-    """Check if we can generate a new app based on cooldown and current generation status."""
-    current_time = time.time()
+def try_acquire_generation(now=None):
+    """
+    Atomically check the cooldown/in-progress state and, if a new generation is
+    allowed, mark one as started. Two requests can't both pass the check.
+    `now` is an optional time.monotonic() snapshot taken by the caller.
     
-    # If we're already generating, block new generations
-    if GENERATION_LOCK["is_generating"]:
-        add_log("App generation already in progress. Please wait...", "warning")
-        return False
-        
-    # Check if we're still in the cooldown period
-    time_since_last = current_time - GENERATION_LOCK["last_generation_time"]
-    if time_since_last < GENERATION_LOCK["cooldown_seconds"]:
-        remaining = GENERATION_LOCK["cooldown_seconds"] - time_since_last
-        add_log(f"Generation cooldown in effect. Please wait {remaining:.1f} seconds.", "warning")
-        return False
+    Returns:
+        (ok, reason): ok is True if the caller now owns the generation slot;
+        otherwise reason explains why not
+    """
+    with _GENERATION_STATE_LOCK:
+        if _gen_free.is_set():
+            _mark_generating()
+            return True, None
+        is_generating = GENERATION_LOCK["is_generating"]
         
-    return True
+    if is_generating:
+        # If we're already generating, block new generations
+        reason = "App generation already in progress. Please wait..."
+    else:
+        # Otherwise we're still in the cooldown period
+        _, remaining = get_generation_status(now)
+        reason = f"Generation cooldown in effect. Please wait {remaining:.1f} seconds."
+    add_log(reason, "warning")
+    return False, reason
+
+def get_generation_status(now=None):
+    """Return (is_generating, cooldown_seconds_remaining) for error responses."""
+    if now is None:
+        now = time.monotonic()
+    with _GENERATION_STATE_LOCK:
+        is_generating = GENERATION_LOCK["is_generating"]
+        time_since_last = now - GENERATION_LOCK["last_generation_time"]
+    return is_generating, max(0, GENERATION_LOCK["cooldown_seconds"] - time_since_last)
+
+def _mark_generating():
+    """Flag a generation as running and close the gate. Caller holds _GENERATION_STATE_LOCK."""
+    global _gen_timer
+    GENERATION_LOCK["is_generating"] = True
+    if _gen_timer is not None:
+        _gen_timer.cancel()
+        _gen_timer = None
+    _gen_free.clear()
 
 def start_generation():
     """Mark the start of app generation."""
-    GENERATION_LOCK["is_generating"] = True
+    with _GENERATION_STATE_LOCK:
+        _mark_generating()
     
 def end_generation():
     """Mark the end of app generation and update the cooldown timer."""
-    GENERATION_LOCK["is_generating"] = False
-    GENERATION_LOCK["last_generation_time"] = time.time()
+    global _gen_timer
+    with _GENERATION_STATE_LOCK:
+        GENERATION_LOCK["is_generating"] = False
+        GENERATION_LOCK["last_generation_time"] = time.monotonic()
+        
+        # Reopen the gate once the cooldown has passed
+        if _gen_timer is not None:
+            _gen_timer.cancel()
+        _gen_timer = threading.Timer(GENERATION_LOCK["cooldown_seconds"], _open_generation_gate)
+        _gen_timer.daemon = True
+        _gen_timer.start()
+
+@contextlib.contextmanager
+def generation_slot():
+    """
+    Mark an app generation as running for the duration of a with-block.
+    end_generation() runs when the block exits, even if it raises.
+    """
+    start_generation()
+    try:
+        yield
+    finally:
+        end_generation()
+
+def _open_generation_gate():
+    """Timer callback: allow new generations unless the timer was superseded."""
+    with _GENERATION_STATE_LOCK:
+        # A timer cancelled while already firing must not reopen the gate
+        if threading.current_thread() is _gen_timer and not GENERATION_LOCK["is_generating"]:
+            _gen_free.set()
+
+def _print_header_and_log(payment_service, payment_url):
+    """Print a payment header and log the result (queued by toggle_payment_mode)."""
+    result = receipt_manager.print_payment_header(payment_service, payment_url)
+    add_log("Header print result: %s", "debug", "Success" if result else "Failed")
 
 # Initialize Venmo QR manager with email monitoring
 def init_venmo_system():
@@ -180,6 +349,9 @@ def init_venmo_system():
     else:
         print(f"WARNING: Venmo QR code not found at: {qr_path}")
     
+    # Render the payment QR codes now so status polls only have to look them up
+    _refresh_qr_cache()
+    
     # Start email monitoring in the background
     init_email_monitoring()
 
@@ -189,59 +361,150 @@ def index():
     """Serve the main HTML page."""
     return send_from_directory(app.static_folder, "index.html")
 
-@app.route("/apps/<path_or_id>/", defaults={'path': 'index.html'})
-@app.route("/apps/<path_or_id>/<path:path>")
-def serve_generated_app(path_or_id, path):
+def _send_app_file(app_dir, path, immutable=False):
     """
-    Serve files from generated apps directory.
-    Can use either app_id or slug as the path parameter.
+    Send a generated app file with browser caching enabled.
+    Repeat QR scans are answered from the browser cache, or with a 304 when it revalidates.
+    Files requested by app ID never change, so they are marked immutable for a year;
+    a slug can be re-pointed at a newer app, so those keep the shorter lifetime.
+    Behind nginx (APPS_ACCEL_REDIRECT_PREFIX set) the file itself is sent by nginx.
+    """
+    max_age = GENERATED_APP_IMMUTABLE_SECONDS if immutable else GENERATED_APP_CACHE_SECONDS
+    if APPS_ACCEL_REDIRECT_PREFIX:
+        file_path = safe_join(app_dir, path)
+        if file_path is None:
+            return "App not found", 404
+        response = Response()
+        response.headers["X-Accel-Redirect"] = APPS_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + os.path.relpath(file_path, GENERATED_APPS_DIR).replace(os.sep, "/")
+        del response.headers["Content-Type"]  # Let nginx pick it from the file extension
+        response.cache_control.max_age = max_age
+    else:
+        response = send_from_directory(app_dir, path, conditional=True, max_age=max_age)
+    
+    response.cache_control.public = True
+    response.cache_control.immutable = immutable
+    return response
+
+def _resolve_app_dir(path_or_id):
+    """
+    Find the directory of a generated app from its app_id or slug.
+    
+    Returns:
+        Tuple of (app directory, whether path_or_id is the app_id), or None if there is no such app
     """
+    if not _APP_ID_RE.match(path_or_id):
+        return None
+        
     # First try direct match with directory name (app_id)
     app_dir = os.path.join(GENERATED_APPS_DIR, path_or_id)
     
     # Check if the app directory exists with that exact name
     if os.path.isdir(app_dir):
         # Direct match found (likely an app_id)
-        return send_from_directory(app_dir, path)
+        return app_dir, True
     
     # If not found directly, try to find it by slug using the mapping file
     try:
-        import json
-        mapping_file = os.path.join(GENERATED_APPS_DIR, "slug_mapping.json")
-        
-        if os.path.exists(mapping_file):
-            with open(mapping_file, 'r') as f:
-                mapping = json.load(f)
-                
-            # Look up app_id by slug
-            if path_or_id in mapping:
-                app_id = mapping[path_or_id]
-                app_dir = os.path.join(GENERATED_APPS_DIR, app_id)
-                
-                if os.path.isdir(app_dir):
-                    return send_from_directory(app_dir, path)
+        with open(_SLUG_MAPPING_FILE, 'r') as f:
+            mapping = json.load(f)
+            
+        # Look up app_id by slug
+        if path_or_id in mapping:
+            app_id = mapping[path_or_id]
+            app_dir = os.path.join(GENERATED_APPS_DIR, app_id)
+            
+            if os.path.isdir(app_dir):
+                return app_dir, False
+    except FileNotFoundError:
+        pass  # No slugs recorded yet
     except Exception as e:
         print(f"Error looking up slug mapping: {e}")
     
     # If still not found
-    return "App not found", 404
+    return None
+
+@app.route("/apps/<path_or_id>/", defaults={'path': 'index.html'})
+@app.route("/apps/<path_or_id>/<path:path>")
+def serve_generated_app(path_or_id, path):
+    """
+    Serve files from generated apps directory.
+    Can use either app_id or slug as the path parameter.
+    """
+    resolved = _resolve_app_dir(path_or_id)
+    if resolved is None:
+        return "App not found", 404
+    app_dir, is_app_id = resolved
+    return _send_app_file(app_dir, path, immutable=is_app_id)
+
+@app.route("/api/app-qr/<path_or_id>.png")
+def app_qr_code(path_or_id):
+    """
+    Serve the QR code that links to a generated app (by app_id or slug) as a PNG.
+    Sending the image itself keeps it out of the status JSON, where base64 adds a third.
+    """
+    # Only encode codes for apps that exist, so the QR cache can't be filled with made-up IDs
+    if _resolve_app_dir(path_or_id) is None:
+        return "App not found", 404
+    
+    png_bytes = generate_qr_code_png(f"{_EXTERNAL_HOST}/apps/{path_or_id}/")
+    if not png_bytes:
+        return "QR code unavailable", 500
+    
+    # The image changes only if the external host does, so revalidate by ETag
+    response = Response(png_bytes, mimetype="image/png")
+    response.add_etag()
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+# Blocks whose whitespace is significant and must be served unchanged
+_HTML_PRESERVE_RE = re.compile(r"<(pre|textarea)\b.*?</\1>", re.S | re.I)
+# Any whitespace run that contains a line break (indentation, blank lines)
+_HTML_INDENT_RE = re.compile(r"[ \t]*\n\s*")
+
+def _minify_html(html):
+    """
+    Collapse indentation and blank lines in an HTML page.
+    Line breaks are kept (as a single newline) so inline scripts with
+    // comments still work; <pre> and <textarea> content is left as is.
+    """
+    parts = []
+    pos = 0
+    for match in _HTML_PRESERVE_RE.finditer(html):
+        parts.append(_HTML_INDENT_RE.sub("\n", html[pos:match.start()]))
+        parts.append(match.group(0))
+        pos = match.end()
+    parts.append(_HTML_INDENT_RE.sub("\n", html[pos:]))
+    return "".join(parts).strip()
+
+# The VibePay template has no dynamic content, so it is rendered and minified
+# on the first request and the encoded page is reused for every request after that
+_VIBEPAY_HTML = None
 
 @app.route("/vibepay")
 def vibepay_payment():
     """Serve the VibePay simulation page."""
-    return render_template("vibepay.html")
+    global _VIBEPAY_HTML
+    if _VIBEPAY_HTML is None:
+        _VIBEPAY_HTML = _minify_html(render_template("vibepay.html")).encode("utf-8")
+    return Response(_VIBEPAY_HTML, mimetype="text/html",
+                    headers={"Cache-Control": "public, max-age=3600"})
+
+def _on_vibepay_generation_done(future):
+    """
+    Done-callback for queued VibePay generations. generate_app_for_payment
+    releases the generation lock itself, but a job cancelled before it ran
+    (e.g. at shutdown) never gets that far, and a crash in the worker would
+    otherwise vanish inside the future.
+    """
+    if future.cancelled():
+        end_generation()
+        add_log("Queued VibePay generation was cancelled", "warning")
+    elif future.exception() is not None:
+        add_log("VibePay generation failed: %s", "error", future.exception())
 
 @app.route("/api/vibepay-payment", methods=["POST"])
 def process_vibepay_payment():
     """Process a simulated VibePay payment."""
-    # Check if we can generate a new app (cooldown and lock mechanism)
-    if not can_generate_new_app():
-        return jsonify({
-            "error": "App generation cooldown in effect or another app is being generated",
-            "cooldown_seconds_remaining": max(0, GENERATION_LOCK["cooldown_seconds"] - (time.time() - GENERATION_LOCK["last_generation_time"])),
-            "is_generating": GENERATION_LOCK["is_generating"]
-        }), 429  # 429 Too Many Requests
-        
     # Get the payment info from the request body
     data = request.get_json()
     if not data:
@@ -255,64 +518,101 @@ def process_vibepay_payment():
     except (ValueError, TypeError):
         return jsonify({"error": "Invalid amount"}), 400
         
-    note = data.get("note", "")
-    if not note or len(note.strip()) == 0:
+    # Strip once; the stripped note is what gets printed and generated
+    note = (data.get("note") or "").strip()
+    if not note:
         return jsonify({"error": "Note is required"}), 400
         
+    # Acquire the generation lock (cooldown and lock check in one step).
+    # One snapshot keeps the check and the reported cooldown consistent.
+    now = time.monotonic()
+    acquired, _ = try_acquire_generation(now)
+    if not acquired:
+        is_generating, cooldown_remaining = get_generation_status(now)
+        return jsonify({
+            "error": "App generation cooldown in effect or another app is being generated",
+            "cooldown_seconds_remaining": cooldown_remaining,
+            "is_generating": is_generating
+        }), 429  # 429 Too Many Requests
+        
     # Log the payment
-    add_log(f"VibePay payment received: ${amount:.2f} for '{note}'", "info")
+    add_log("VibePay payment received: $%.2f for '%s'", "info", amount, note)
     
-    # Use our receipt manager to print the payment confirmation
     payment_details = {
         "amount": amount,
         "note": note,
         "sender": "VibePay User",
         "timestamp": time.time()
     }
-    receipt_manager.print_payment_confirmation(payment_details)
-    
-    # Acquire the generation lock
-    start_generation()
     
-    # Use the same flow as real Venmo payments to generate the app
+    # Use the same flow as real Venmo payments to generate the app.
+    # Only the hand-off needs an error path: once the job is submitted,
+    # generate_app_for_payment releases the generation lock when it finishes.
     try:
-        # Generate the app directly 
-        add_log(f"Starting app generation for VibePay payment", "info")
+        # Use our receipt manager to print the payment confirmation (on the printer thread)
+        queue_print(receipt_manager.print_payment_confirmation, payment_details)
         
-        generate_app_for_payment(
+        # Generation runs on the background worker
+        add_log("Starting app generation for VibePay payment", "info")
+        future = _GEN_POOL.submit(
+            generate_app_for_payment,
             note,
             amount,
             "VibePay User"  # This specific user identifier helps track the payment source
         )
-        
-        # Update the last payment for the UI but mark it as processed
-        venmo_qr_manager.last_payment = {
-            "amount": amount,
-            "note": note,
-            "sender": "VibePay User",
-            "timestamp": time.time(),
-            "processed": True  # Mark as already processed to prevent duplicate generation from UI
-        }
-        
-        # Calculate tier and iterations
-        tier = get_app_tier(amount)
-        iterations = calculate_iterations(amount, tier)
-        
-        return jsonify({
-            "success": True,
-            "message": "Payment processed successfully",
-            "tier": tier,
-            "iterations": iterations,
-            "amount": amount
-        })
+        future.add_done_callback(_on_vibepay_generation_done)
+        job_id = str(uuid.uuid4())
+        with _GENERATION_JOBS_LOCK:
+            _GENERATION_JOBS[job_id] = future
+            # Forget the oldest finished jobs so the registry stays bounded
+            for old_id in list(_GENERATION_JOBS)[:-_MAX_GENERATION_JOBS]:
+                if _GENERATION_JOBS[old_id].done():
+                    del _GENERATION_JOBS[old_id]
     except Exception as e:
         # Release lock on error
         end_generation()
-        add_log(f"Error processing VibePay payment: {e}", "error")
+        add_log("Error processing VibePay payment: %s", "error", e)
         return jsonify({
             "success": False,
             "error": f"Error processing payment: {str(e)}"
         }), 500
+    
+    # Update the last payment for the UI but mark it as processed
+    venmo_qr_manager.last_payment = {
+        **payment_details,
+        "processed": True  # Mark as already processed to prevent duplicate generation from UI
+    }
+    notify_status_changed()
+    
+    # Calculate tier and iterations
+    tier = get_app_tier(amount)
+    iterations = calculate_iterations(amount, tier)
+    
+    return jsonify({
+        "success": True,
+        "message": "Payment accepted, app generation started",
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": url_for("generation_status", job_id=job_id),
+        "tier": tier,
+        "iterations": iterations,
+        "amount": amount
+    }), 202  # 202 Accepted: generation continues in the background
+
+@app.route("/api/generation-status/<job_id>")
+def generation_status(job_id):
+    """Report the state of a VibePay generation started by /api/vibepay-payment."""
+    with _GENERATION_JOBS_LOCK:
+        future = _GENERATION_JOBS.get(job_id)
+    if future is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+    if not future.done():
+        return jsonify({"job_id": job_id, "status": "running"}), 202
+    
+    generated_app = None if future.cancelled() or future.exception() else future.result()
+    if generated_app is None:
+        return jsonify({"job_id": job_id, "status": "failed", "error": "App generation failed"}), 500
+    return jsonify({"job_id": job_id, "status": "done", **generated_app}), 200
 
 @app.route("/api/venmo-scanned")
 def venmo_scanned():
@@ -321,10 +621,10 @@ def venmo_scanned():
     current_mode = PAYMENT_MODE["current_mode"]
     payment_service = PAYMENT_MODE[current_mode]["name"]
     
-    add_log(f"Someone scanned the {payment_service} QR code", "info")
+    add_log("Someone scanned the %s QR code", "info", payment_service)
     
-    # Print a simple scan notification
-    thermal_printer_manager.print_text([
+    # Print a simple scan notification (on the printer thread)
+    queue_print(thermal_printer_manager.print_text, [
         f"{payment_service.upper()} QR SCANNED!",
         "Waiting for payment confirmation...",
         time.strftime("%H:%M:%S"),
@@ -370,81 +670,171 @@ def toggle_payment_mode():
     
     # Update the payment mode
     PAYMENT_MODE["current_mode"] = requested_mode
+    notify_status_changed()
     
     # Log the mode change
-    add_log(f"Payment mode switched from {current_mode} to {requested_mode}", "info")
+    add_log("Payment mode switched from %s to %s", "info", current_mode, requested_mode)
     
     # Get payment URL and format it properly for the current mode
     payment_service = PAYMENT_MODE[requested_mode]["name"]
     
-    # Get proper URL depending on payment mode
-    if requested_mode == "venmo":
-        payment_url = PAYMENT_MODE[requested_mode].get("app_url", PAYMENT_MODE[requested_mode]["url"])
-    else:
-        payment_url = PAYMENT_MODE[requested_mode]["url"]
-        # Create a full URL for VibePay if using local path
-        if payment_url.startswith("/"):
-            local_ip = get_local_ip()
-            port = int(os.getenv("PORT", 5002))
-            payment_url = f"http://{local_ip}:{port}{payment_url}"
-    
-    # Use receipt manager to print the new header with QR code
-    add_log(f"Printing header for {payment_service} with URL: {payment_url}", "debug")
-    result = receipt_manager.print_payment_header(payment_service, payment_url)
-    add_log(f"Header print result: {'Success' if result else 'Failed'}", "debug")
+    payment_url = get_payment_url(requested_mode)
+    
+    # Use receipt manager to print the new header with QR code (on the printer thread)
+    add_log("Printing header for %s with URL: %s", "debug", payment_service, payment_url)
+    queue_print(_print_header_and_log, payment_service, payment_url)
     
     return jsonify({
         "message": f"Payment mode switched to {requested_mode}",
         "payment_mode": requested_mode
     })
 
+# Status fields that never change while the server runs; built once so the
+# polled /api/email-status endpoint only has to fill in the live values
+_STATUS_STATIC = {
+    "venmo_profile_url": VENMO_CONFIG["venmo_profile_url"],
+    "vibepay_url": VIBEPAY_FULL_URL,
+}
+_STATUS_DEBUG_STATIC = {
+    "venmo_url": get_payment_url("venmo"),  # Use the app URL here for reference
+    "vibepay_url": PAYMENT_MODE["vibepay"]["url"],
+}
+
+def refresh_local_ip():
+    """
+    Re-resolve the local IP (e.g. after the installation moves to another network)
+    and rebuild the URLs and payment QR codes derived from it.
+    
+    Returns:
+        The newly resolved local IP
+    """
+    global _LOCAL_IP, VIBEPAY_FULL_URL, _EXTERNAL_HOST
+    get_local_ip.cache_clear()
+    _LOCAL_IP = get_local_ip()
+    VIBEPAY_FULL_URL = f"http://{_LOCAL_IP}:{PORT}{PAYMENT_MODE['vibepay']['url']}"
+    _EXTERNAL_HOST = build_external_host(EXTERNAL_HOST, _LOCAL_IP, PORT)
+    _PAYMENT_URLS["vibepay"] = VIBEPAY_FULL_URL
+    _STATUS_STATIC["vibepay_url"] = VIBEPAY_FULL_URL
+    _refresh_qr_cache()
+    add_log("Local IP refreshed: %s", "info", _LOCAL_IP)
+    return _LOCAL_IP
+
+@app.route("/api/refresh-local-ip", methods=["POST"])
+def refresh_local_ip_route():
+    """Re-resolve the local IP after a network change (operator endpoint)."""
+    local_ip = refresh_local_ip()
+    return jsonify({"local_ip": local_ip, "vibepay_url": VIBEPAY_FULL_URL})
+
+# (etag, JSON bytes) of the last /api/email-status payload built
+_STATUS_BODY = (None, b"")
+
+def _email_status_etag(current_mode):
+    """
+    Weak ETag for /api/email-status built from the values that change what the UI shows.
+    last_payment / last_generated_app and the cached QR codes are replaced, never
+    mutated, so their identity (plus the payment/app timestamp) tracks changes.
+    """
+    last_payment = venmo_qr_manager.last_payment
+    last_app = venmo_qr_manager.last_generated_app
+    key = (
+        current_mode,
+        email_processor.monitoring_active,
+        id(last_payment), last_payment.get("timestamp") if last_payment else None,
+        id(last_app), last_app.get("timestamp") if last_app else None,
+        id(_QR_CACHE.get("venmo")), id(_QR_CACHE.get("vibepay")),
+    )
+    return f"{hash(key) & 0xFFFFFFFFFFFFFFFF:016x}"
+
 @app.route("/api/email-status")
 def get_email_status():
     """Get the status of email monitoring and last payment."""
-    # Use the venmo_qr_manager's last_payment
-    last_payment = venmo_qr_manager.last_payment
-    last_generated_app = venmo_qr_manager.last_generated_app
-    
-    # Log the current payment mode for debugging
+    # This endpoint is polled by the UI, so keep it free of logging and recomputation
     current_mode = PAYMENT_MODE["current_mode"]
-    payment_service = PAYMENT_MODE[current_mode]["name"]
-    add_log(f"Current payment mode (from /api/email-status): {current_mode}", "debug")
     
-    # Get Venmo QR code - use app URL for mobile Venmo app opening
-    venmo_app_url = PAYMENT_MODE["venmo"].get("app_url", PAYMENT_MODE["venmo"]["url"])
-    venmo_qr_code = generate_qr_code_base64(venmo_app_url)
+    # While nothing has changed, the browser revalidates its copy and gets an empty 304
+    etag = _email_status_etag(current_mode)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        etag, body = _current_status_body(current_mode, etag)
+        response = Response(body, mimetype="application/json")
     
-    # Generate VibePay QR code
-    vibepay_url = PAYMENT_MODE["vibepay"]["url"]
-    if vibepay_url.startswith("/"):
-        local_ip = get_local_ip()
-        port = int(os.getenv("PORT", 5002))
-        vibepay_url = f"http://{local_ip}:{port}{vibepay_url}"
-    vibepay_qr_code = generate_qr_code_base64(vibepay_url)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"  # Always revalidate; the ETag makes that cheap
+    return response
+
+def _current_status_body(current_mode, etag=None):
+    """Return (etag, JSON bytes) for the current status, reusing the last body if unchanged."""
+    global _STATUS_BODY
+    if etag is None:
+        etag = _email_status_etag(current_mode)
+    # The same state always serializes to the same body, so reuse the last one
+    cached_etag, body = _STATUS_BODY
+    if cached_etag != etag:
+        body = _build_email_status_body(current_mode)
+        _STATUS_BODY = (etag, body)
+    return etag, body
+
+# Stream subscribers wait on this and are woken by notify_status_changed(). State
+# changed outside main (e.g. by the email monitor) is caught by the periodic re-check.
+_STATUS_CHANGED = threading.Condition()
+_STATUS_STREAM_CHECK_SECONDS = 1.0
+_STATUS_STREAM_HEARTBEAT_SECONDS = 15.0  # Comment line so proxies keep an idle stream open
+
+def notify_status_changed():
+    """Wake /api/email-status/stream subscribers so they push the new status right away."""
+    with _STATUS_CHANGED:
+        _STATUS_CHANGED.notify_all()
+
+@app.route("/api/email-status/stream")
+def stream_email_status():
+    """Push the /api/email-status payload as Server-Sent Events whenever it changes."""
+    def events():
+        sent_etag = None
+        last_sent = 0.0
+        while True:
+            etag, body = _current_status_body(PAYMENT_MODE["current_mode"])
+            now = time.monotonic()
+            if etag != sent_etag:
+                sent_etag, last_sent = etag, now
+                # A multi-line body (pretty-printed in debug mode) needs a data: prefix per line
+                yield b"data: " + body.replace(b"\n", b"\ndata: ") + b"\n\n"
+            elif now - last_sent >= _STATUS_STREAM_HEARTBEAT_SECONDS:
+                last_sent = now
+                yield b": keep-alive\n\n"
+            with _STATUS_CHANGED:
+                _STATUS_CHANGED.wait(_STATUS_STREAM_CHECK_SECONDS)
+    
+    response = Response(events(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Don't let nginx hold back events
+    return response
+
+def _build_email_status_body(current_mode):
+    """Serialize the /api/email-status payload for the current state."""
+    now = time.time()
     
-    # Get current system status
+    # Get current system status (QR codes are rendered at startup)
     status = {
         "email_monitoring": email_processor.monitoring_active,
-        "last_payment": last_payment,
-        "last_generated_app": last_generated_app,
-        "timestamp": time.time(),
-        "venmo_profile_url": VENMO_CONFIG["venmo_profile_url"],
-        "venmo_qr_code": venmo_qr_code,
-        "vibepay_qr_code": vibepay_qr_code,
-        "vibepay_url": vibepay_url,
+        "last_payment": venmo_qr_manager.last_payment,
+        "last_generated_app": venmo_qr_manager.last_generated_app,
+        "timestamp": now,
+        "venmo_qr_code": _payment_qr_code("venmo"),
+        "vibepay_qr_code": _payment_qr_code("vibepay"),
         "payment_mode": current_mode,
         "debug_info": {
             "current_mode": current_mode,
-            "server_time": time.time(),
-            "venmo_url": venmo_app_url,  # Use the app URL here for reference
-            "vibepay_url": PAYMENT_MODE["vibepay"]["url"]
-        }
+            "server_time": now,
+            **_STATUS_DEBUG_STATIC
+        },
+        **_STATUS_STATIC
     }
     
-    return jsonify(status)
+    return json_bytes(app, status)
 
 # Function to generate app from payment data
-def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid: str = "TestUser") -> None:
+def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid: str = "TestUser") -> Optional[Dict[str, Any]]:
     """
     Generate an app based on a received payment.
     Called automatically when a payment is received through email monitoring.
@@ -453,32 +843,35 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
         app_type: The type of app to generate (from the payment note)
         payment_amount: The amount of the payment
         user_who_paid: Name of the user who paid (from Venmo note if possible)
+        
+    Returns:
+        The generated app info (as stored in last_generated_app), or None if generation failed
     """
-    try:
-        log_msg = f"Starting app generation for payment: '{app_type}' (${payment_amount:.2f}) from '{user_who_paid}'"
-        add_log(log_msg, "info")
+    # The generation slot is released when the block exits, on every path
+    with generation_slot():
+        try:
+            log_msg = f"Starting app generation for payment: '{app_type}' (${payment_amount:.2f}) from '{user_who_paid}'"
+            add_log(log_msg, "info")
         
-        # For Venmo payments received via email, we need to print the payment confirmation
-        # VibePay payments already have their confirmation printed in the process_vibepay_payment endpoint
-        if user_who_paid != "VibePay User":
-            # Print payment confirmation for Venmo payments
-            payment_details = {
-                "amount": payment_amount,
-                "note": app_type,
-                "sender": user_who_paid,
-                "timestamp": time.time()
-            }
-            receipt_manager.print_payment_confirmation(payment_details)
+            # For Venmo payments received via email, we need to print the payment confirmation
+            # VibePay payments already have their confirmation printed in the process_vibepay_payment endpoint
+            if user_who_paid != "VibePay User":
+                # Print payment confirmation for Venmo payments
+                payment_details = {
+                    "amount": payment_amount,
+                    "note": app_type,
+                    "sender": user_who_paid,
+                    "timestamp": time.time()
+                }
+                queue_print(receipt_manager.print_payment_confirmation, payment_details)
 
-        try:
             # Call App Generation Logic
             generated_app_details = generate_app_files(app_type, payment_amount)
             
             if not generated_app_details:
-                err_msg = f"Failed to generate app for payment: {app_type}"
-                add_log(err_msg, "error")
+                add_log("Failed to generate app for payment: %s", "error", app_type)
                 # Print error message if generation failed
-                thermal_printer_manager.print_text([
+                queue_print(thermal_printer_manager.print_text, [
                     "APP GENERATION FAILED",
                     f"Request: {app_type}",
                     f"Amount: ${payment_amount:.2f}",
@@ -487,9 +880,7 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
                     "--------------------",
                     time.strftime("%Y-%m-%d %H:%M:%S")
                 ], align='left', cut=True)
-                # Release the generation lock
-                end_generation()
-                return
+                return None
             
             app_id = generated_app_details["app_id"]
             app_tier = generated_app_details["tier"]
@@ -497,47 +888,36 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
             app_title = generated_app_details.get("title", actual_app_type)
             app_slug = generated_app_details.get("slug", "")
     
-            # Call GitHub Integration with title and slug
-            github_url = github_service.push_to_github(
+            # Start the GitHub push with title and slug; it doesn't affect the hosted URL
+            github_future = _PUSH_POOL.submit(
+                github_service.push_to_github,
                 generated_app_details["path"], 
                 app_id,
                 actual_app_type,
                 title=app_title,
-                slug=app_slug
+                slug=app_slug,
+                files=generated_app_details.get("files")
             )
             
-            # Generate base URL for hosted app using IP address
-            local_ip = get_local_ip()
-            base_url = os.getenv("EXTERNAL_HOST", f"http://{local_ip}:5002")
-            if not base_url.startswith(('http://', 'https://')):
-                base_url = f"http://{base_url}"
-                
             # Use the slug in the URL if available, otherwise use app_id
             url_path = app_slug if app_slug else app_id
             hosted_url_relative = f"/apps/{url_path}/"
-            hosted_url_full = f"{base_url.strip('/')}{hosted_url_relative}"
+            hosted_url_full = f"{_EXTERNAL_HOST}{hosted_url_relative}"
             
-            # Generate QR code for the app (for UI)
-            qr_code_base64 = generate_qr_code_base64(hosted_url_full)
+            # Render the app's QR code (served to the UI as a PNG) while the push is in flight
+            generate_qr_code_png(hosted_url_full)
+            qr_code_url = f"/api/app-qr/{url_path}.png"
             
-            # Try to extract a nice title from the README.md if it exists
-            app_title = actual_app_type  # Default to app_type if we can't extract a title
-            readme_path = os.path.join(generated_app_details["path"], "README.md")
-            if os.path.exists(readme_path):
-                try:
-                    with open(readme_path, 'r') as readme_file:
-                        readme_content = readme_file.read()
-                        # Look for the first markdown heading
-                        import re
-                        title_match = re.search(r'^#\s+(.+)$', readme_content, re.MULTILINE)
-                        if title_match:
-                            app_title = title_match.group(1).strip()
-                except Exception as e:
-                    add_log(f"Error extracting title from README: {e}", "warning")
+            # Use the README's first heading as the title (the generator already extracted it),
+            # falling back to the app type
+            app_title = generated_app_details.get("readme_title") or actual_app_type
             
             # Get iteration count if available
             iterations = generated_app_details.get("iterations", 1)
             
+            github_url = wait_for_push(github_future)
+            completed_at = time.time()  # One timestamp for the receipt and the UI
+            
             # Use the receipt manager to print the app completion details
             app_details = {
                 "app_id": app_id,
@@ -546,12 +926,14 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
                 "tier": app_tier,
                 "amount": payment_amount,  # Include payment amount
                 "iterations": iterations,  # Include iteration count
-                "github_url": github_url
+                "github_url": github_url,
+                "timestamp": completed_at
             }
-            receipt_manager.print_app_completion(app_details, hosted_url_full)
+            queue_print(receipt_manager.print_app_completion, app_details, hosted_url_full,
+                        github_ok=push_succeeded(github_url))
             
             # Store the generated app info for access by the UI
-            venmo_qr_manager.last_generated_app = {
+            generated_app = venmo_qr_manager.last_generated_app = {
                 "app_id": generated_app_details["app_id"],
                 "app_type": generated_app_details["app_type"],
                 "title": app_title,
@@ -560,44 +942,43 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
                 "hosted_url_full": hosted_url_full,
                 "hosted_url_relative": hosted_url_relative,
                 "github_url": github_url,
-                "qr_code_image": qr_code_base64,
+                "qr_code_url": qr_code_url,
                 "message": f"App {app_title} generated successfully with {iterations} iterations (Tier: {generated_app_details['tier']}).",
                 "readme_generated": "readme_path" in generated_app_details,
-                "timestamp": time.time(),
+                "timestamp": completed_at,
                 "payment_amount": payment_amount,  # Include payment amount
                 "logs": log_msg
             }
+            notify_status_changed()
             
             # Log the success
-            add_log(f"App generation completed: {app_type} (${payment_amount})", "info")
-            add_log(f"App available at: {hosted_url_full}", "info")
-            add_log(f"GitHub repository: {github_url}", "info")
+            add_log("App generation completed: %s ($%s)", "info", app_type, payment_amount)
+            add_log("App available at: %s", "info", hosted_url_full)
+            add_log("GitHub repository: %s", "info", github_url)
             
             # Print a new receipt header for the next customer
             # Get payment service details for the current mode
             current_mode = PAYMENT_MODE["current_mode"]
             payment_service = PAYMENT_MODE[current_mode]["name"]
-            payment_url = PAYMENT_MODE[current_mode]["url"]
-            
-            # Format full URL for VibePay if needed
-            if current_mode == "vibepay" and payment_url.startswith("/"):
-                local_ip = get_local_ip()
-                port = int(os.getenv("PORT", 5002))
-                payment_url = f"http://{local_ip}:{port}{payment_url}"
+            payment_url = get_payment_url(current_mode)
             
             # Print header for new transaction
-            receipt_manager.print_payment_header(payment_service, payment_url)
-            
-        finally:
-            # Always release the generation lock, even if there's an error
-            end_generation()
+            queue_print(receipt_manager.print_payment_header, payment_service, payment_url)
+            return generated_app
             
-    except Exception as e:
-        # Make sure we release the lock in case of any exceptions
-        end_generation()
-        add_log(f"Error generating app from payment: {e}", "error")
+        except Exception as e:
+            add_log("Error generating app from payment: %s", "error", e)
+            return None
+
+def print_initial_header():
+    """Print the payment header for the current payment mode so the first customer can pay."""
+    current_mode = PAYMENT_MODE["current_mode"]
+    payment_service = PAYMENT_MODE[current_mode]["name"]
+    payment_url = get_payment_url(current_mode)
+    queue_print(receipt_manager.print_payment_header, payment_service, payment_url)
 
 # --- Main Execution ---
+# For deployment, run the app through wsgi.py with a production server instead
 if __name__ == "__main__":
     # Initialize the Venmo payment system
     init_venmo_system()
@@ -610,24 +991,11 @@ if __name__ == "__main__":
     
     # Initialize receipt for current payment mode (only on initial run)
     if is_initial_run:
-        current_mode = PAYMENT_MODE["current_mode"]
-        payment_service = PAYMENT_MODE[current_mode]["name"]
-        
-        # Get proper URL depending on payment mode
-        if current_mode == "venmo":
-            payment_url = PAYMENT_MODE[current_mode].get("app_url", PAYMENT_MODE[current_mode]["url"])
-        else:
-            payment_url = PAYMENT_MODE[current_mode]["url"]
-            # Format full URL for VibePay if needed
-            if payment_url.startswith("/"):
-                local_ip = get_local_ip()
-                port = int(os.getenv("PORT", 5002))
-                payment_url = f"http://{local_ip}:{port}{payment_url}"
-        
         # Print initial payment header (only once)
-        receipt_manager.print_payment_header(payment_service, payment_url)
+        print_initial_header()
     
-    # Use port 5002 for local testing
-    port = int(os.getenv("PORT", 5002))
-    # Set debug=True for development
-    app.run(debug=True, host="0.0.0.0", port=port)
\ No newline at end of file
+    # Development fallback: the Werkzeug server with a thread per request.
+    # For the installation, serve wsgi:app with gunicorn instead (see wsgi.py).
+    # The debugger and reloader stay on here unless DEBUG is set to false in the environment.
+    debug = DEBUG if "DEBUG" in os.environ else True
+    app.run(debug=debug, host=HOST, port=PORT, threaded=True)
\ No newline at end of file
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.11
+"""
+Network helpers for Vibe Coder application.
+This module resolves the local IP address and the base URL that links to hosted apps use.
+"""
+import socket
+import threading
+import functools
+
+# UDP socket reused by get_local_ip(); connect() on a datagram socket sends nothing,
+# it only asks the kernel which local address routes to the target
+_IP_SOCK = None
+_IP_SOCK_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def get_local_ip():
+    """
+    Get the local IP address of this machine for network connections.
+    The result is cached; call get_local_ip.cache_clear() after a network change.
+    """
+    global _IP_SOCK
+    with _IP_SOCK_LOCK:
+        for _ in range(2):
+            try:
+                if _IP_SOCK is None:
+                    _IP_SOCK = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                # Re-connect every time so the route (and source address) is re-resolved.
+                # The address doesn't need to be reachable
+                _IP_SOCK.connect(('8.8.8.8', 80))
+                return _IP_SOCK.getsockname()[0]
+            except OSError:
+                # The interface may have gone away under the socket; retry once with a fresh one
+                if _IP_SOCK is not None:
+                    _IP_SOCK.close()
+                    _IP_SOCK = None
+    return "localhost"
+
+@functools.lru_cache(maxsize=4)
+def build_external_host(external_host, local_ip, port):
+    """
+    Return the base URL for links to hosted apps: external_host if set, otherwise this machine.
+    
+    Args:
+        external_host: The configured EXTERNAL_HOST, or None
+        local_ip: This machine's local IP address
+        port: The port the app is served on
+        
+    Returns:
+        The base URL, scheme-prefixed and without a trailing slash
+    """
+    external_host = external_host or f"http://{local_ip}:{port}"
+    if not external_host.startswith(('http://', 'https://')):
+        external_host = f"http://{external_host}"
+    return external_host.strip('/')
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3.11
+"""
+QR code encoding helpers for the Vibe Coder application.
+QR module matrices are written straight to a 1-bit grayscale PNG; building a PIL
+image and running it through PIL's PNG writer costs several times more for the
+same pixels.
+"""
+import re
+import struct
+import zlib
+import functools
+import qrcode
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Scheme and host of an http(s) URL; both are case-insensitive, and upper-cased
+# they fit QR alphanumeric mode (5.5 bits per character instead of 8)
+_URL_ORIGIN_RE = re.compile(r"\Ahttps?://[a-z0-9.:\-]+(?=/|\Z)", re.IGNORECASE)
+
+def add_url_data(qr, url: str) -> None:
+    """
+    Add a URL to a QRCode, encoding the scheme and host as an upper-case
+    alphanumeric segment and the (case-sensitive) rest as bytes.
+    This often fits the code into a smaller version. Other URLs are added unchanged.
+    
+    Args:
+        qr: qrcode.QRCode to add the data to
+        url: The URL to encode
+    """
+    match = _URL_ORIGIN_RE.match(url)
+    if not match:
+        qr.add_data(url)
+        return
+    qr.add_data(match.group(0).upper())
+    if match.end() < len(url):
+        qr.add_data(url[match.end():])
+
+@functools.lru_cache(maxsize=128)
+def qr_modules(url: str) -> tuple:
+    """
+    Encode a URL as a QR code and return its module matrix, without a border.
+    Cached per URL, so the web UI and the thermal printer share one encoding of
+    each code instead of running the Reed-Solomon encoder for each of them.
+    Errors propagate, so a failed encoding is never cached.
+    
+    Args:
+        url: The URL to encode
+        
+    Returns:
+        Tuple of rows of booleans (True = dark)
+    """
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=0,
+        # Any mask is valid; fixing one skips qrcode's pure-Python scoring of all 8
+        mask_pattern=0,
+    )
+    add_url_data(qr, url)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    """Frame one PNG chunk: length, tag, data and CRC."""
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+def qr_matrix_to_png(matrix, box_size: int, border: int = 0) -> bytes:
+    """
+    Encode a QR module matrix as a black-on-white 1-bit PNG.
+    
+    Args:
+        matrix: Rows of booleans (True = dark), as from QRCode.get_matrix() or qr_modules()
+        box_size: Width and height in pixels of each module
+        border: Number of light modules to add around the matrix
+        
+    Returns:
+        The PNG image as bytes
+    """
+    if border:
+        light_row = (False,) * (len(matrix) + 2 * border)
+        light_side = (False,) * border
+        matrix = (
+            [light_row] * border
+            + [light_side + tuple(row) + light_side for row in matrix]
+            + [light_row] * border
+        )
+    size = len(matrix) * box_size
+    scanlines = []
+    for row in matrix:
+        # One bit per pixel, 0 = black; pad the row out to whole bytes with white
+        bits = "".join("0" * box_size if dark else "1" * box_size for dark in row)
+        bits += "1" * (-len(bits) % 8)
+        # Filter type 0 (none) followed by the packed pixels, repeated for each pixel row of the module
+        scanlines.append((b"\x00" + int(bits, 2).to_bytes(len(bits) // 8, "big")) * box_size)
+    header = struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0)  # 1-bit grayscale, no interlace
+    return (
+        _PNG_SIGNATURE
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(b"".join(scanlines), 1))
+        + _png_chunk(b"IEND", b"")
+    )
@@ -3,18 +3,29 @@
 QR code generation service for Vibe Coder application.
 This module handles creation of QR codes for various application uses.
 """
-import io
 import base64
 import logging
-import qrcode
+import functools
 from typing import Optional
 
 # Import error handling
 from src.error_handling import exception_handler
+from src.qr_png import qr_matrix_to_png, qr_modules
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=128)
+def _render_png_bytes(url: str, box_size: int, border: int) -> bytes:
+    """
+    Render the QR code for a URL as PNG bytes.
+    Cached per (url, box_size, border): the same hosted URL is rendered for the UI,
+    saved to files and re-requested while the app is shown. Errors propagate, so a
+    failed render is never cached.
+    """
+    # The module matrix is shared with the other users of the same URL
+    return qr_matrix_to_png(qr_modules(url), box_size, border)
+
 class QRCodeService:
     """Service class for handling QR code generation."""
     
@@ -33,28 +44,7 @@ class QRCodeService:
             Base64 encoded PNG image of the QR code
         """
         try:
-            # Create QR code instance
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=box_size,
-                border=border,
-            )
-            
-            # Add data
-            qr.add_data(url)
-            qr.make(fit=True)
-            
-            # Create image
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            img.save(buffer, format="PNG")
-            buffer.seek(0)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            
-            return img_base64
+            return base64.b64encode(_render_png_bytes(url, box_size, border)).decode("ascii")
             
         except Exception as e:
             logger.error(f"Error generating QR code for {url}: {e}")
@@ -76,21 +66,9 @@ class QRCodeService:
             True if successful, False otherwise
         """
         try:
-            # Create QR code instance
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=box_size,
-                border=border,
-            )
-            
-            # Add data
-            qr.add_data(url)
-            qr.make(fit=True)
-            
-            # Create image and save to file
-            img = qr.make_image(fill_color="black", back_color="white")
-            img.save(file_path)
+            # Write the cached PNG instead of rendering and encoding it again
+            with open(file_path, "wb") as f:
+                f.write(_render_png_bytes(url, box_size, border))
             
             logger.info(f"QR code for '{url}' saved to {file_path}")
             return True
@@ -12,36 +12,33 @@ VIBE_CODER_ASCII = [
     " \\/ ||_)(-`  \\__(_)(_|(-`| "
 ]
 
-class ReceiptManager:
-    """Manages the printing of receipts for the app purchase workflow."""
-    
-    def __init__(self):
-        # Simplified - printer is always considered available (will print to console if not)
-        self.current_transaction_in_progress = False
-        # Configure logger
-        logging.basicConfig(level=logging.INFO)
-        self.logger = logging.getLogger(__name__)
-    
-    def print_payment_header(self, payment_mode, payment_url):
-        """
-        Print the initial receipt header when waiting for payment.
-        Always cuts the paper and prints a new header when called.
-        
-        Args:
-            payment_mode: The payment mode name (e.g., "Venmo" or "VibePay")
-            payment_url: The URL to use for the payment QR code
-        """
-        # Always cut the paper before printing a new header
-        thermal_printer_manager.cut_paper()
-        
-        # Always mark that we're starting a new transaction
-        self.current_transaction_in_progress = True
-        
-        # Header lines to print
-        header_lines = [
-            "App Design as a Commodity",
-            "Interactive Art Installation",
-            time.strftime("%m/%d/%Y"),
+# Cache for the receipt header date, refreshed when the calendar day changes
+_DATE_CACHE = {"day": None, "str": ""}
+
+def _today_str(now=None):
+    """Return today's date formatted for the receipt header (MM/DD/YYYY)."""
+    if now is None:
+        now = time.localtime()
+    day = (now.tm_year, now.tm_yday)
+    if day != _DATE_CACHE["day"]:
+        _DATE_CACHE["str"] = time.strftime("%m/%d/%Y", now)
+        _DATE_CACHE["day"] = day
+    return _DATE_CACHE["str"]
+
+# Header lines printed above the date on every receipt
+_HEADER_TOP = (
+    "App Design as a Commodity",
+    "Interactive Art Installation",
+)
+
+# Header lines that only depend on the payment mode, built once per mode name
+_HEADER_BODY = {}
+
+def _header_body(payment_mode):
+    """Return the receipt header lines that follow the date line for a payment mode."""
+    lines = _HEADER_BODY.get(payment_mode)
+    if lines is None:
+        lines = _HEADER_BODY[payment_mode] = (
             "www.haukesand.github.io",
             "",
             "",
@@ -63,29 +60,71 @@ class ReceiptManager:
             "--------------------",
             f"Scan QR code to pay with {payment_mode}:",
             "",
-        ]
+        )
+    return lines
+
+class ReceiptManager:
+    """Manages the printing of receipts for the app purchase workflow."""
+    
+    def __init__(self):
+        # Simplified - printer is always considered available (will print to console if not)
+        self.current_transaction_in_progress = False
+        # Logging itself is configured once in config.py
+        self.logger = logging.getLogger(__name__)
+    
+    def print_payment_header(self, payment_mode, payment_url):
+        """
+        Print the initial receipt header when waiting for payment.
+        Always cuts the paper and prints a new header when called.
+        
+        Args:
+            payment_mode: The payment mode name (e.g., "Venmo" or "VibePay")
+            payment_url: The URL to use for the payment QR code
+        """
+        # Always mark that we're starting a new transaction
+        self.current_transaction_in_progress = True
+        
+        # One clock reading for the whole header (date line and waiting time)
+        now = time.localtime()
+        waiting_time = time.strftime("%H:%M:%S", now)
+        
+        # Header lines to print
+        header_lines = (*_HEADER_TOP, _today_str(now), *_header_body(payment_mode))
         
         try:
-            # Print the header
-            thermal_printer_manager.print_text(header_lines, align='center', cut=False)
-            
-            # Print the payment QR code - with larger size
-            thermal_printer_manager.print_qr(
-                payment_url, 
-                text_above=f"PAY WITH {payment_mode.upper()}", 
-                text_below="Include app description in payment note",
-                cut=False,
-                size=10  # Increase QR code size (default is usually 3-4)
-            )
+            # The whole header goes to the printer in one write
+            with thermal_printer_manager.batch() as sent:
+                # Always cut the paper before printing a new header
+                thermal_printer_manager.cut_paper()
+                
+                # Print the header
+                thermal_printer_manager.print_text(header_lines, align='center', cut=False)
+                
+                # Print the payment QR code - with larger size
+                thermal_printer_manager.print_qr(
+                    payment_url, 
+                    text_above=f"PAY WITH {payment_mode.upper()}", 
+                    text_below="Include app description in payment note",
+                    cut=False,
+                    size=10  # Increase QR code size (default is usually 3-4)
+                )
+                
+                # Add a waiting message
+                thermal_printer_manager.print_text([
+                    "",
+                    "WAITING FOR PAYMENT...",
+                    waiting_time,
+                    "",
+                    "",
+                ], align='center', cut=False)
             
-            # Add a waiting message
-            thermal_printer_manager.print_text([
-                "",
-                "WAITING FOR PAYMENT...",
-                time.strftime("%H:%M:%S"),
-                "",
-                "",
-            ], align='center', cut=False)
+            if not sent["ok"]:
+                self._print_to_console([
+                    *header_lines,
+                    f"QR CODE URL: {payment_url}",
+                    f"WAITING FOR PAYMENT... ({waiting_time})",
+                ])
+                return False
             
             self.logger.info(f"Payment header printed for {payment_mode}")
             return True
@@ -97,7 +136,7 @@ class ReceiptManager:
             for line in header_lines:
                 self.logger.info(line)
             self.logger.info(f"QR CODE URL: {payment_url}")
-            self.logger.info(f"WAITING FOR PAYMENT... ({time.strftime('%H:%M:%S')})")
+            self.logger.info(f"WAITING FOR PAYMENT... ({waiting_time})")
             self.logger.info("----------------------------------------")
             
             # Still consider this a successful print for flow purposes
@@ -123,6 +162,8 @@ class ReceiptManager:
             amount = payment_details.get("amount", 0)
             note = payment_details.get("note", "")
             sender = payment_details.get("sender", "Customer")
+            # Stamp the receipt with the payment's own time (receipts can wait in the print queue)
+            paid_at = time.localtime(payment_details.get("timestamp"))
             
             # Payment confirmation section
             confirmation_lines = [
@@ -135,13 +176,13 @@ class ReceiptManager:
                 "",
                 "Generating your app now...",
                 "Please wait",
-                time.strftime("%Y-%m-%d %H:%M:%S"),
+                time.strftime("%Y-%m-%d %H:%M:%S", paid_at),
                 "",
                 "",
             ]
             
-            # Print to thermal printer - simplified implementation
-            thermal_printer_manager.print_text(confirmation_lines, align='left', cut=False)
+            # Print to thermal printer as one block of text
+            thermal_printer_manager.print_block("\n".join(confirmation_lines), align='left', cut=False)
             self.logger.info("Payment confirmation printed")
             
             return True
@@ -150,13 +191,15 @@ class ReceiptManager:
             self.logger.error(f"Error printing payment confirmation: {e}")
             return False
     
-    def print_app_completion(self, app_details, hosted_url_full):
+    def print_app_completion(self, app_details, hosted_url_full, github_ok=True):
         """
         Print the app completion section with QR code, and cut the paper.
         
         Args:
             app_details: Dict with app information
             hosted_url_full: URL where the app is hosted (for QR code)
+            github_ok: Whether the GitHub push succeeded; the repository QR code
+                is only printed if it did
         """
         if not self.current_transaction_in_progress:
             self.logger.warning("No transaction in progress - starting a new one for app completion")
@@ -175,6 +218,9 @@ class ReceiptManager:
             # Get information about iterations if available
             iterations = app_details.get("iterations", 1)
             
+            # Stamp the receipt with the completion time recorded by the caller
+            completed_at = time.localtime(app_details.get("timestamp"))
+            
             # App completion section
             completion_lines = [
                 "--------------------",
@@ -205,70 +251,86 @@ class ReceiptManager:
                 "App Design as a Commodity",
                 "",
                 "Made with <3 by Vibe Coder",
-                time.strftime("%Y-%m-%d %H:%M:%S"),
+                time.strftime("%Y-%m-%d %H:%M:%S", completed_at),
                 "",
                 "",
             ]
             
-            # Print to thermal printer - completion message
-            thermal_printer_manager.print_text(completion_lines, align='left', cut=False)
+            # The whole completion receipt goes to the printer in one write
+            with thermal_printer_manager.batch() as sent:
+                # Print to thermal printer - completion message
+                thermal_printer_manager.print_block("\n".join(completion_lines), align='left', cut=False)
             
-            # Print the QR code to access the app
-            try:
-                thermal_printer_manager.print_qr(
-                    hosted_url_full,
-                    text_above="YOUR APP IS READY",
-                    text_below="Scan to use your app",
-                    cut=False,
-                    size=10  # Larger QR code for app access
-                )
-                
-                # Print GitHub info and QR code if available
-                if github_url and "Error:" not in github_url and "not found" not in github_url and "denied" not in github_url:
-                    thermal_printer_manager.print_text([
-                        "",
-                        "GITHUB REPOSITORY:",
-                        "Scan to view source code:"
-                    ], align='center', cut=False)
-                    
-                    # Print GitHub QR code (smaller size)
+                # Print the QR code to access the app
+                try:
                     thermal_printer_manager.print_qr(
-                        github_url,
-                        text_above=None,
-                        text_below=None,
+                        hosted_url_full,
+                        text_above="YOUR APP IS READY",
+                        text_below="Scan to use your app",
                         cut=False,
-                        size=6  # Smaller QR code for GitHub
+                        size=10  # Larger QR code for app access
                     )
                 
-                # Add a final thank you message and cut the paper
-                thermal_printer_manager.print_text(thank_you_lines, align='center', cut=True)
+                    # Print GitHub info and QR code if available
+                    if github_ok and github_url:
+                        thermal_printer_manager.print_text([
+                            "",
+                            "GITHUB REPOSITORY:",
+                            "Scan to view source code:"
+                        ], align='center', cut=False)
+                    
+                        # Print GitHub QR code (smaller size)
+                        thermal_printer_manager.print_qr(
+                            github_url,
+                            text_above=None,
+                            text_below=None,
+                            cut=False,
+                            size=6  # Smaller QR code for GitHub
+                        )
                 
-                self.logger.info("App completion receipt printed and paper cut")
-            except Exception as e:
-                self.logger.error(f"Error printing QR code: {e}")
-                # Print URL as fallback
-                thermal_printer_manager.print_text([
-                    "QR CODE ERROR - USE URL BELOW:",
-                    hosted_url_full,
-                ], align='center', cut=False)
+                    # Add a final thank you message and cut the paper
+                    thermal_printer_manager.print_block("\n".join(thank_you_lines), align='center', cut=True)
+                
+                except Exception as e:
+                    self.logger.error(f"Error printing QR code: {e}")
+                    # Print URL as fallback
+                    thermal_printer_manager.print_text([
+                        "QR CODE ERROR - USE URL BELOW:",
+                        hosted_url_full,
+                    ], align='center', cut=False)
                 
-                # Console debugging info
-                self.logger.info("\n----- APP COMPLETION (ERROR FALLBACK) -----")
-                for line in completion_lines:
-                    self.logger.info(line)
-                self.logger.info(f"QR CODE URL: {hosted_url_full}")
-                for line in thank_you_lines:
-                    self.logger.info(line)
-                self.logger.info("----------------------------------------")
+                    # Console debugging info
+                    self.logger.info("\n----- APP COMPLETION (ERROR FALLBACK) -----")
+                    for line in completion_lines:
+                        self.logger.info(line)
+                    self.logger.info(f"QR CODE URL: {hosted_url_full}")
+                    for line in thank_you_lines:
+                        self.logger.info(line)
+                    self.logger.info("----------------------------------------")
             
             # Transaction is complete
             self.current_transaction_in_progress = False
+            
+            if not sent["ok"]:
+                self._print_to_console([
+                    *completion_lines,
+                    f"QR CODE URL: {hosted_url_full}",
+                    *([f"GITHUB: {github_url}"] if github_ok and github_url else []),
+                    *thank_you_lines,
+                ])
+                return False
+            
+            self.logger.info("App completion receipt printed and paper cut")
             return True
             
         except Exception as e:
             self.logger.error(f"Error printing app completion: {e}")
             return False
 
+    def _print_to_console(self, lines):
+        """Print receipt lines to the console when the printer didn't take them."""
+        print("[CONSOLE] " + "\n[CONSOLE] ".join(lines))
+
     def _cut_paper(self):
         """Cut the paper if the printer supports it."""
         try:
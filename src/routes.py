@@ -1,12 +1,18 @@
 #!/usr/bin/env python3.11
 """
 Routes for the Vibe Coder application.
-This module contains all Flask routes for the web application.
+This module contains a Blueprint version of the web application's routes.
+api_bp is not registered on the running app: main.py defines and serves the
+live routes, so behavior changes to served endpoints belong there.
 """
 import os
+import re
 import time
-import socket
 import sys
+import queue
+import threading
+import uuid
+import concurrent.futures
 from flask import (
     Flask, 
     request, 
@@ -14,18 +20,24 @@ from flask import (
     send_from_directory, 
     url_for, 
     render_template, 
-    Blueprint
+    Blueprint,
+    copy_current_request_context
 )
 
 # Add parent directory to path to fix imports when run directly
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import services
-from src.thermal_printer import thermal_printer_manager
-from src.github_service import github_service
+from src.thermal_printer import thermal_printer_manager, queue_print
+from src.github_service import github_service, push_succeeded, wait_for_push
+from src.network import get_local_ip, build_external_host
 from src.qr_service import qr_service
 from src.logging_service import logging_service
-from src.app_generator import generate_app_files
+from src.json_provider import install_json_provider
+from src.app_generator import generate_app_files, model as _gen_model
+
+# The Gemini model is configured once at import, so its name is fixed for the run
+_MODEL_NAME = getattr(_gen_model, "_model_name", None) or "gemini-1.5-pro-latest"
 
 # Import Venmo related modules
 from src.venmo_email import email_processor, init_email_monitoring
@@ -33,19 +45,78 @@ from src.venmo_qr import venmo_qr_manager
 from src.venmo_config import VENMO_CONFIG, EMAIL_CONFIG
 
 # Import configuration
-from src.config import GENERATED_APPS_DIR
+from src.config import GENERATED_APPS_DIR, GENERATED_APP_CACHE_SECONDS, EXTERNAL_HOST, PORT
 
 # Import error handling
 from src.error_handling import (
     api_exception_handler, 
+    AppError,
+    ErrorCodes,
     ValidationError
 )
 
 # Create a Blueprint for the API
 api_bp = Blueprint('api', __name__, static_folder="../static", static_url_path="")
 
+# Serialize the large /generate payloads (base64 QR, logs) with orjson when available
+api_bp.record_once(lambda state: install_json_provider(state.app))
+
+# --- Email Payment Queue ---
+
+# Payments found by a manual email check are queued and handled one at a time
+# by a single worker thread, so the request returns without waiting on generation
+_PAYMENT_QUEUE = queue.Queue()
+_payment_worker = None
+_payment_worker_lock = threading.Lock()
+
+def _drain_payment_queue():
+    """Hand queued payments to the Venmo manager in arrival order."""
+    while True:
+        payment = _PAYMENT_QUEUE.get()
+        try:
+            if venmo_qr_manager.handle_payment(payment):
+                logging_service.add_log("Processed payment: $%s for %s", "info", payment.get("amount"), payment.get("note"))
+        except Exception as e:
+            logging_service.add_log("Error processing queued payment: %s", "error", e)
+
+def _enqueue_payments(payments):
+    """Queue payments for the payment worker, starting it on first use."""
+    global _payment_worker
+    with _payment_worker_lock:
+        if _payment_worker is None:
+            _payment_worker = threading.Thread(target=_drain_payment_queue, daemon=True)
+            _payment_worker.start()
+    for payment in payments:
+        _PAYMENT_QUEUE.put(payment)
+
+# --- Hosted App URLs ---
+
+def _hosted_app_urls(app_id):
+    """
+    Return the (relative, full) URLs of a generated app, as served by serve_generated_app.
+    Built directly instead of through url_for, which walks the URL map on every call.
+    """
+    hosted_url_relative = f"/apps/{app_id}/"
+    return hosted_url_relative, f"{build_external_host(EXTERNAL_HOST, get_local_ip(), PORT)}{hosted_url_relative}"
+
+# --- Background Generation ---
+
+# /generate hands the Gemini call, GitHub push and QR generation to a single
+# worker thread and returns a job ID; /generate/status/<job_id> reports the result
+_GEN_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+# The GitHub push runs here while the generation thread builds the app's QR code
+_PUSH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="github")
+
+_GENERATION_JOBS = {}  # job_id -> Future, oldest first
+_GENERATION_JOBS_LOCK = threading.Lock()
+_MAX_GENERATION_JOBS = 50  # Finished jobs beyond this are forgotten
+
 # --- Static Routes ---
 
+# App IDs are letters, digits and dashes only, so a valid ID joined onto
+# GENERATED_APPS_DIR can never point outside it
+_APP_ID_RE = re.compile(r"\A[A-Za-z0-9-]+\Z")
+
 @api_bp.route("/")
 def index():
     """Serve the main HTML page."""
@@ -54,18 +125,18 @@ def index():
 @api_bp.route("/apps/<app_id>/")
 def serve_generated_app(app_id):
     """Serve the index.html of a generated app."""
-    if not app_id or not all(c.isalnum() or c == "-" for c in app_id):
+    if not _APP_ID_RE.match(app_id):
          return jsonify({"error": "Invalid app ID format"}), 400
          
-    app_directory = os.path.abspath(os.path.join(GENERATED_APPS_DIR, app_id))
-    if not app_directory.startswith(GENERATED_APPS_DIR):
-        return jsonify({"error": "Invalid app path"}), 400
-        
+    app_directory = os.path.join(GENERATED_APPS_DIR, app_id)
     index_path = os.path.join(app_directory, "index.html")
     if not os.path.exists(index_path):
         return jsonify({"error": "App not found"}), 404
         
-    return send_from_directory(app_directory, "index.html")
+    # Cacheable: repeat QR scans are served from the browser cache or revalidated with a 304
+    response = send_from_directory(app_directory, "index.html", conditional=True, max_age=GENERATED_APP_CACHE_SECONDS)
+    response.cache_control.public = True
+    return response
 
 # --- API Routes ---
 
@@ -75,7 +146,7 @@ def venmo_scanned():
     """Handle notification that someone scanned the Venmo QR code."""
     # Log the scan
     logging_service.add_log("Someone scanned the Venmo QR code", "info")
-    thermal_printer_manager.print_text([
+    queue_print(thermal_printer_manager.print_text, [
         "VENMO QR SCANNED!",
         "User is at the payment step.",
         "Waiting for Venmo email...",
@@ -141,25 +212,24 @@ def get_email_status():
 @api_bp.route("/api/check-emails", methods=["POST"])
 @api_exception_handler
 def check_emails_now():
-    """Manually check for new emails."""
+    """
+    Manually check for new emails.
+    Found payments are queued for the payment worker and the request returns 202 right
+    away, so payments_found counts the payments found and queued, not ones already processed.
+    """
     if not email_processor.monitoring_active:
         raise ValidationError("Email monitoring is not active")
     
     # Force a check for new emails
     payments = email_processor.fetch_recent_venmo_emails()
     
-    # Process any found payments
-    payment_count = 0
-    for payment in payments:
-        # Process the payment through the venmo_qr_manager
-        if venmo_qr_manager.handle_payment(payment):
-            payment_count += 1
-            logging_service.add_log(f"Processed payment: ${payment.get('amount')} for {payment.get('note')}", "info")
+    # Hand any found payments to the payment worker
+    _enqueue_payments(payments)
         
     return jsonify({
-        "message": "Email check completed",
-        "payments_found": payment_count
-    })
+        "message": "Email check completed, payments queued",
+        "payments_found": len(payments)
+    }), 202
 
 @api_bp.route("/generate", methods=["POST", "GET"])
 @api_exception_handler
@@ -197,82 +267,90 @@ def generate_app_route():
         except (ValueError, TypeError):
             raise ValidationError("Invalid amount specified")
 
+    # Run the pipeline in the background. The copied request context carries the app context,
+    # which the @exception_handler services it calls need to build their JSON error responses
+    pipeline = copy_current_request_context(_run_generation_pipeline)
+    job_id = str(uuid.uuid4())
+    with _GENERATION_JOBS_LOCK:
+        _GENERATION_JOBS[job_id] = _GEN_EXECUTOR.submit(pipeline, app_type, payment_amount)
+        # Forget the oldest finished jobs so the registry stays bounded
+        for old_id in list(_GENERATION_JOBS)[:-_MAX_GENERATION_JOBS]:
+            if _GENERATION_JOBS[old_id].done():
+                del _GENERATION_JOBS[old_id]
+    
+    return jsonify({
+        "message": "App generation started",
+        "job_id": job_id,
+        "status_url": url_for("api.generate_status_route", job_id=job_id),
+        "app_type_received": app_type,
+        "amount_received": payment_amount
+    }), 202
+
+@api_bp.route("/generate/status/<job_id>")
+@api_exception_handler
+def generate_status_route(job_id):
+    """Report the state of a background app generation job."""
+    with _GENERATION_JOBS_LOCK:
+        future = _GENERATION_JOBS.get(job_id)
+    if future is None:
+        raise AppError(f"Unknown generation job: {job_id}", ErrorCodes.RESOURCE_NOT_FOUND)
+    
+    if not future.done():
+        return jsonify({"job_id": job_id, "status": "running"}), 202
+    
+    try:
+        result = future.result()
+    except AppError as e:
+        return jsonify({"job_id": job_id, "status": "failed", **e.to_dict()}), 500
+    return jsonify({"job_id": job_id, "status": "done", **result}), 200
+
+def _run_generation_pipeline(app_type, payment_amount):
+    """
+    Generate the app, push it to GitHub and build its links (runs on _GEN_EXECUTOR).
+    
+    Returns:
+        The response fields for the finished job
+    """
     # Call App Generation Logic (Step 004 - Enhanced)
     generated_app_details = generate_app_files(app_type, payment_amount)
     
     if not generated_app_details:
         # Error logged within generate_app_files
-        return jsonify({"error": f"Failed to generate app code for type: {app_type}"}), 500
+        raise AppError(f"Failed to generate app code for type: {app_type}", ErrorCodes.APP_GENERATION_ERROR)
 
-    # Call GitHub Integration 
-    github_url = github_service.push_to_github(
+    # Start the GitHub push; the hosted URL and QR code don't depend on it
+    github_future = _PUSH_EXECUTOR.submit(
+        github_service.push_to_github,
         generated_app_details["path"], 
         generated_app_details["app_id"],
-        generated_app_details["app_type"]
+        generated_app_details["app_type"],
+        files=generated_app_details.get("files")
     )
 
-    # Web Hosting URL (using local route)
-    hosted_url_relative = url_for("api.serve_generated_app", app_id=generated_app_details["app_id"], _external=False)
-    
-    # Use IP address for URLs
-    def get_local_ip():
-        try:
-            # Get the local IP by creating a socket connection to an external server
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            # The address doesn't need to be reachable
-            s.connect(('8.8.8.8', 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "localhost"
-            
-    local_ip = get_local_ip()
-    
-    # Use environment variable for external URL, falling back to IP address
-    external_host = os.getenv("EXTERNAL_HOST", f"http://{local_ip}:5002")
-    if not external_host.startswith(('http://', 'https://')):
-        external_host = f"http://{external_host}"
-    hosted_url_full = f"{external_host.strip('/')}{hosted_url_relative}"
+    # Web Hosting URL (local route; full URL uses EXTERNAL_HOST or the cached local IP)
+    hosted_url_relative, hosted_url_full = _hosted_app_urls(generated_app_details["app_id"])
 
     # Generate QR code
     qr_code_base64 = qr_service.generate_base64(hosted_url_full)
+    github_url = wait_for_push(github_future)
 
-    # Get actual model info from app_generator
-    import sys
-    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-    from src.app_generator import model
-    
-    model_name = "gemini-1.5-pro-latest"
-    if model and hasattr(model, "_model_name"):
-        model_name = model._model_name
-        
     # Add accurate AI model information
     ai_info = [
-        f"AI: {model_name}",
+        f"AI: {_MODEL_NAME}",
         f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}",
         f"App ID: {generated_app_details['app_id']}"
     ]
     
-    # Capture the most recent logs, filtering out noise
-    filtered_logs = []
-    for log in logging_service.get_logs(limit=20):
-        msg = log['message'].lower()
-        # Skip unwanted logs
-        if any(x in msg for x in ['debugger', 'pin:', 'http/1.1', 'api/email-status']):
-            continue
-        filtered_logs.append(log)
-    
-    # Get the recent logs after filtering
-    recent_logs = filtered_logs[-8:] if filtered_logs else []
-    log_entries = [f"{log['message']}" for log in recent_logs]
+    # Capture the most recent logs (noise is filtered out when they are added)
+    recent_logs = logging_service.get_display_logs(limit=8)
+    log_entries = [log['message'] for log in recent_logs]
     
     # Combine AI info with log messages
     all_logs = ai_info + ["---"] + log_entries
     log_messages = "\n".join(all_logs)
     
-    # Return success response including the full URL
-    return jsonify({
+    # Return the job result including the full URL
+    return {
         "message": f"App {generated_app_details['app_id']} generated successfully (Tier: {generated_app_details['tier']}).",
         "app_type_received": app_type,
         "amount_received": payment_amount,
@@ -283,7 +361,7 @@ def generate_app_route():
         "readme_generated": "readme_path" in generated_app_details, # Boolean indicating if README was generated
         "user": "testuser", # Hardcoded user as requested
         "logs": log_messages
-    }), 200
+    }
 
 # Function to generate app from payment data
 def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid: str = "TestUser") -> None:
@@ -299,7 +377,7 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
     try:
         log_msg = f"Starting app generation for payment: '{app_type}' (${payment_amount:.2f}) from '{user_who_paid}'"
         logging_service.add_log(log_msg, "info")
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             "PAYMENT RECEIVED!",
             f"User: {user_who_paid}",
             f"Amount: ${payment_amount:.2f}",
@@ -313,9 +391,8 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
         generated_app_details = generate_app_files(app_type, payment_amount)
         
         if not generated_app_details:
-            err_msg = f"Failed to generate app for payment: {app_type}"
-            logging_service.add_log(err_msg, "error")
-            thermal_printer_manager.print_text([
+            logging_service.add_log("Failed to generate app for payment: %s", "error", app_type)
+            queue_print(thermal_printer_manager.print_text, [
                 "APP GENERATION FAILED",
                 f"Request: {app_type}",
                 f"Amount: ${payment_amount:.2f}",
@@ -330,7 +407,7 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
         app_tier = generated_app_details["tier"]
         actual_app_type = generated_app_details["app_type"] # Use type from details
 
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             f"APP '{actual_app_type}' GENERATED!",
             f"Tier: {app_tier}",
             f"ID: {app_id}",
@@ -338,63 +415,49 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
             "Pushing to GitHub...",
         ], align='left') # No cut yet, more details to follow
 
-        # Call GitHub Integration
-        github_url = github_service.push_to_github(
+        # Start the GitHub push; the hosted URL and QR code don't depend on it
+        github_future = _PUSH_EXECUTOR.submit(
+            github_service.push_to_github,
             generated_app_details["path"], 
             app_id,
-            actual_app_type
+            actual_app_type,
+            files=generated_app_details.get("files")
         )
         
-        # Check for common error indicators in the returned GitHub URL string
-        if "Error:" in github_url or "(Repo not found" in github_url or "(Permission denied" in github_url or "pat-not-set" in github_url:
-            thermal_printer_manager.print_text([
+        # Hosted app URL (EXTERNAL_HOST or the local IP, which is probed once and cached)
+        hosted_url_relative, hosted_url_full = _hosted_app_urls(app_id)
+        
+        # Generate QR code for the app (for UI)
+        qr_code_base64 = qr_service.generate_base64(hosted_url_full)
+        
+        github_url = wait_for_push(github_future)
+        
+        if not push_succeeded(github_url):
+            queue_print(thermal_printer_manager.print_text, [
                 "GITHUB PUSH FAILED.",
                 "Details in server logs.",
                 "App was generated locally.",
             ], align='left')
         else:
-            thermal_printer_manager.print_text([
+            queue_print(thermal_printer_manager.print_text, [
                 "Pushed to GitHub successfully!",
                  github_url, # This might be long, but good for a receipt
             ], align='left')
 
-        # Generate base URL for hosted app using IP address
-        # Try to get local network IP address
-        import socket
-        def get_local_ip_for_receipt(): # Renamed to avoid conflict if imported elsewhere
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(('8.8.8.8', 80))
-                ip = s.getsockname()[0]
-                s.close()
-                return ip
-            except Exception:
-                return "localhost"
-                
-        local_ip = get_local_ip_for_receipt()
-        base_url = os.getenv("EXTERNAL_HOST", f"http://{local_ip}:5002")
-        if not base_url.startswith(('http://', 'https://')):
-            base_url = f"http://{base_url}"
-            
-        hosted_url_relative = f"/apps/{app_id}/"
-        hosted_url_full = f"{base_url.strip('/')}{hosted_url_relative}"
-        
-        # Generate QR code for the app (for UI)
-        qr_code_base64 = qr_service.generate_base64(hosted_url_full)
-        
-        thermal_printer_manager.print_text([
+        queue_print(thermal_printer_manager.print_text, [
             "--------------------",
             "YOUR APP IS READY!",
             "Access URL:",
             # hosted_url_full, # URL printed by QR function's text_below
             "Scan QR code below to view:",
         ], align='left')
-        thermal_printer_manager.print_qr(hosted_url_full, text_below=f"{actual_app_type} ({app_id})", cut=False) # Add app type to QR text
+        queue_print(thermal_printer_manager.print_qr, hosted_url_full, text_below=f"{actual_app_type} ({app_id})", cut=False) # Add app type to QR text
 
-        thermal_printer_manager.print_text([
+        completed_at = time.time()  # One timestamp for the receipt and the UI
+        queue_print(thermal_printer_manager.print_text, [
             "--------------------",
             "Thank you for using Vibe Coder!",
-            time.strftime("%Y-%m-%d %H:%M:%S")
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(completed_at))
         ], align='center', cut=True)
         
         # Store the generated app info for access by the UI
@@ -408,14 +471,14 @@ def generate_app_for_payment(app_type: str, payment_amount: float, user_who_paid
             "qr_code_image": qr_code_base64,
             "message": f"App {generated_app_details['app_id']} generated successfully (Tier: {generated_app_details['tier']}).",
             "readme_generated": "readme_path" in generated_app_details,
-            "timestamp": time.time(),
+            "timestamp": completed_at,
             "logs": log_msg
         }
         
         # Log the success
-        logging_service.add_log(f"App generation completed: {app_type} (${payment_amount})", "info")
-        logging_service.add_log(f"App available at: {hosted_url_full}", "info")
-        logging_service.add_log(f"GitHub repository: {github_url}", "info")
+        logging_service.add_log("App generation completed: %s ($%s)", "info", app_type, payment_amount)
+        logging_service.add_log("App available at: %s", "info", hosted_url_full)
+        logging_service.add_log("GitHub repository: %s", "info", github_url)
         
     except Exception as e:
-        logging_service.add_log(f"Error generating app from payment: {e}", "error")
\ No newline at end of file
+        logging_service.add_log("Error generating app from payment: %s", "error", e)
\ No newline at end of file
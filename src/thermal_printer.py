@@ -7,8 +7,12 @@ import os
 import logging
 import sys
 import time
-from escpos.printer import Usb
+import queue
+import threading
+import contextlib
+from escpos.printer import Usb, Dummy
 from escpos.exceptions import USBNotFoundError, Error as EscposError
+from PIL import Image
 
 # Fix import paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,10 +21,24 @@ if current_dir not in sys.path:
 
 # Local imports
 from config import PRINTER_CONFIG
+from qr_png import qr_modules
 
 # Logger for printer specific messages
 printer_logger = logging.getLogger("thermal_printer")
 
+def _qr_image(matrix, box_size, border=1):
+    """
+    Build a printable image from a QR module matrix (as from qr_modules()).
+    Matches the image escpos renders for printer.qr(): box_size pixels per module
+    and a one-module border.
+    """
+    width = len(matrix)
+    modules = Image.new("1", (width, width))
+    modules.putdata([0 if dark else 255 for row in matrix for dark in row])
+    image = Image.new("1", (width + 2 * border, width + 2 * border), 255)
+    image.paste(modules, (border, border))
+    return image.resize((image.width * box_size, image.height * box_size), Image.NEAREST).convert("RGB")
+
 class ThermalPrinter:
     """Class to handle thermal printer operations."""
     
@@ -34,11 +52,50 @@ class ThermalPrinter:
         """
         self.vendor_id = vendor_id if vendor_id is not None else PRINTER_CONFIG["vendor_id"]
         self.product_id = product_id if product_id is not None else PRINTER_CONFIG["product_id"]
+        self._printer = None  # Shared USB connection, opened on first use
+        self._lock = threading.Lock()  # Serializes access to the connection
+        self._local = threading.local()  # Per-thread ESC/POS buffer while batch() is active
         printer_logger.info(f"Thermal printer configured with Vendor ID 0x{self.vendor_id:04x}, Product ID 0x{self.product_id:04x}")
     
+    def _get_printer(self):
+        """Return the shared USB connection, opening it if needed. Call with self._lock held."""
+        if self._printer is None:
+            self._printer = Usb(self.vendor_id, self.product_id)
+        return self._printer
+
+    def _reset_printer(self):
+        """Close and drop the shared USB connection. Call with self._lock held."""
+        printer, self._printer = self._printer, None
+        if printer and hasattr(printer, 'close'):
+            try:
+                printer.close()
+            except:
+                pass
+
+    def connect(self):
+        """
+        Open the shared USB connection ahead of the first print, so the
+        device enumeration and claim don't delay the first receipt.
+        
+        Returns:
+            True if the printer connection was opened, False otherwise
+        """
+        with self._lock:
+            try:
+                printer = self._get_printer()
+                # Newer python-escpos versions open the device lazily on first access
+                getattr(printer, "device", None)
+                return True
+            except Exception as e:
+                printer_logger.error(f"Printer connection error: {e}")
+                self._reset_printer()
+                return False
+
     def _execute_with_printer(self, operation_func):
         """
-        Execute an operation with a fresh printer connection and ensure it's properly closed.
+        Execute an operation with the shared printer connection.
+        The connection is opened once and reused; it is dropped on error so the
+        next operation reconnects (e.g. after the printer was unplugged).
         
         Args:
             operation_func: Function that takes a printer object and performs operations
@@ -46,38 +103,95 @@ class ThermalPrinter:
         Returns:
             True if successful, False otherwise
         """
-        printer = None
-        try:
-            # Create fresh connection
-            printer = Usb(self.vendor_id, self.product_id)
-            
-            # Execute the operation
-            result = operation_func(printer)
-            
-            # Explicitly close
-            if hasattr(printer, 'close'):
-                printer.close()
-            
-            # Give the system some time to release the resource
-            time.sleep(0.1)
+        with self._lock:
+            try:
+                return operation_func(self._get_printer())
+            except Exception as e:
+                printer_logger.error(f"Printer operation error: {e}")
+                self._reset_printer()
+                return False
+
+    def _execute_batched(self, operation_func):
+        """
+        Execute an operation against an in-memory ESC/POS buffer, then send the
+        whole buffer to the printer in one USB write instead of one per command.
+        
+        Args:
+            operation_func: Function that takes a printer object and performs operations
             
+        Returns:
+            True if successful, False otherwise
+        """
+        # Inside batch() the commands are only added to that thread's buffer
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            return operation_func(batch[0])
+        
+        def _batched_operation(printer):
+            batch = Dummy()
+            batch.profile = printer.profile  # Render images/QR codes for the real device
+            result = operation_func(batch)
+            printer._raw(batch.output)
             return result
-        except Exception as e:
-            printer_logger.error(f"Printer operation error: {e}")
-            # Try to close if it exists
-            if printer and hasattr(printer, 'close'):
-                try:
-                    printer.close()
-                except:
-                    pass
-            return False
+        
+        return self._execute_with_printer(_batched_operation)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect the print_text/print_qr/cut_paper calls this thread makes inside the
+        block into one ESC/POS buffer, and send it in a single USB write at the end.
+        Nested blocks join the outer one.
+        
+        Yields:
+            Dict whose "ok" key is set once the buffer has been sent: True if the
+            printer took it, False if it didn't (the commands inside the block can't
+            tell, since they only write to the buffer)
+        """
+        outer = getattr(self._local, "batch", None)
+        if outer is not None:
+            yield outer[1]
+            return
+        
+        # Usb() is opened without a profile too, so both render for the default profile
+        batch = Dummy()
+        result = {"ok": None}
+        self._local.batch = (batch, result)
+        try:
+            yield result
+        finally:
+            self._local.batch = None
+        
+        def _send_operation(printer):
+            printer._raw(batch.output)
+            return True
+        
+        result["ok"] = not batch.output or self._execute_with_printer(_send_operation)
+        if not result["ok"]:
+            printer_logger.error("Batched receipt could not be sent to the printer")
 
     def print_text(self, lines, align='center', cut=False):
         """
         Print text lines to the thermal printer.
         
         Args:
-            lines: List of strings or single string to print
+            lines: List or tuple of strings or single string to print
+            align: Text alignment ('left', 'center', 'right')
+            cut: Whether to cut the paper after printing
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        if isinstance(lines, (list, tuple)):
+            lines = "\n".join(map(str, lines))
+        return self.print_block(lines, align=align, cut=cut)
+
+    def print_block(self, text, align='left', cut=False):
+        """
+        Print a block of newline-separated text with one alignment command and one write.
+        
+        Args:
+            text: The text to print
             align: Text alignment ('left', 'center', 'right')
             cut: Whether to cut the paper after printing
         
@@ -93,27 +207,19 @@ class ThermalPrinter:
             else:
                 printer.set(align='left')
             
-            # Print text lines
-            if isinstance(lines, list):
-                for line in lines:
-                    printer.text(f"{line}\n")
-            else:
-                printer.text(f"{lines}\n")
+            printer.text(f"{text}\n")
                 
             if cut:
                 printer.cut()
             
             return True
         
-        # Execute with a fresh printer connection
-        success = self._execute_with_printer(_print_operation)
+        # Buffer the receipt and send it with the shared printer connection
+        success = self._execute_batched(_print_operation)
         
         if not success:
             # Print to console as fallback
-            if isinstance(lines, list):
-                print("[CONSOLE] " + "\n[CONSOLE] ".join(lines))
-            else:
-                print(f"[CONSOLE] {lines}")
+            print("[CONSOLE] " + str(text).replace("\n", "\n[CONSOLE] "))
         
         return True
 
@@ -137,7 +243,10 @@ class ThermalPrinter:
             if text_above:
                 printer.text(f"{text_above}\n")
                 
-            printer.qr(data, size=size)
+            # Reuse the cached encoding the web UI renders from instead of printer.qr()
+            printer.text("\n")
+            printer.image(_qr_image(qr_modules(data), size))
+            printer.text("\n\n")
             
             if text_below:
                 printer.text(f"{text_below}\n")
@@ -147,8 +256,8 @@ class ThermalPrinter:
             
             return True
         
-        # Execute with a fresh printer connection
-        success = self._execute_with_printer(_qr_operation)
+        # Buffer the receipt and send it with the shared printer connection
+        success = self._execute_batched(_qr_operation)
         
         if not success:
             # Fallback to console
@@ -163,18 +272,45 @@ class ThermalPrinter:
 
     def cut_paper(self):
         """Cut the paper if the printer supports it."""
-        # Get a fresh printer connection
         def _cut_operation(printer):
             printer.cut()
             return True
             
-        return self._execute_with_printer(_cut_operation)
+        return self._execute_batched(_cut_operation)
 
     def close(self):
         """Close the connection to the printer."""
-        # Nothing to do as we use fresh connections for each operation
+        with self._lock:
+            self._reset_printer()
         printer_logger.info("Thermal printer manager closed")
         return True
 
 # Create singleton instance for importing in other modules
-thermal_printer_manager = ThermalPrinter()
\ No newline at end of file
+thermal_printer_manager = ThermalPrinter()
+
+# --- Print Queue ---
+# Receipts are printed by a single background thread so request handlers and
+# generation never wait on the printer. Jobs run in the order queued.
+_print_queue = queue.Queue()
+_printer_thread = None
+_printer_thread_lock = threading.Lock()
+
+def _printer_worker():
+    """Run queued print jobs one at a time."""
+    while True:
+        func, args, kwargs = _print_queue.get()
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            printer_logger.error(f"Error printing receipt: {e}")
+        finally:
+            _print_queue.task_done()
+
+def queue_print(func, *args, **kwargs):
+    """Queue a receipt_manager/thermal_printer_manager call for the printer thread."""
+    global _printer_thread
+    with _printer_thread_lock:
+        if _printer_thread is None:
+            _printer_thread = threading.Thread(target=_printer_worker, name="printer", daemon=True)
+            _printer_thread.start()
+    _print_queue.put((func, args, kwargs))
\ No newline at end of file
@@ -8,11 +8,15 @@ import os
 import time
 import threading
 import imaplib
+import select
+import ssl
+import itertools
 import email
 import re
 import base64
 import quopri
 from email.header import decode_header
+from email.utils import parsedate_to_datetime
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any, Callable
 import logging
@@ -27,6 +31,9 @@ if current_dir not in sys.path:
 # Import the configuration
 from venmo_config import EMAIL_CONFIG
 
+# Socket timeout for the IMAP connection (seconds); IDLE waits are shorter than this
+IMAP_TIMEOUT_SECONDS = 120
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -45,14 +52,22 @@ class EmailProcessor:
         self.monitor_thread = None
         self.callback_registry = {}  # To store session_id -> callback function mappings
         self.last_processed_uids = set()  # Keep track of processed emails
+        # One IMAP command stream: the monitor thread and manual checks take turns
+        self._imap_lock = threading.RLock()
+        # Set to cut an IMAP IDLE wait short (stop, or a manual check wants the connection)
+        self._wake = threading.Event()
+        self._idle_supported = True  # Cleared if the server rejects IDLE
+        self._idle_tags = itertools.count(1)  # Our own IDLE command tags, outside imaplib's bookkeeping
         
     def connect(self) -> bool:
         """Connect to the IMAP server."""
         try:
             # Create IMAP4 connection with SSL
+            # The timeout keeps a dead connection from blocking the monitor thread forever
             self.imap_conn = imaplib.IMAP4_SSL(
                 EMAIL_CONFIG["imap_server"], 
-                EMAIL_CONFIG["imap_port"]
+                EMAIL_CONFIG["imap_port"],
+                timeout=IMAP_TIMEOUT_SECONDS
             )
             
             # Login to the server
@@ -76,6 +91,12 @@ class EmailProcessor:
     
     def disconnect(self) -> None:
         """Disconnect from the IMAP server."""
+        self._wake.set()  # Let an IDLE wait release the connection
+        with self._imap_lock:
+            self._disconnect()
+            
+    def _disconnect(self) -> None:
+        """Close the IMAP connection; caller holds the IMAP lock."""
         if self.imap_conn:
             try:
                 self.imap_conn.close()
@@ -89,10 +110,11 @@ class EmailProcessor:
                 
     def register_callback(self, session_id: str, callback_fn: Callable) -> None:
         """Register a callback function for a specific session ID."""
+        now = datetime.now()
         self.callback_registry[session_id] = {
             'callback': callback_fn,
-            'created_at': datetime.now(),
-            'last_checked': datetime.now()
+            'created_at': now,
+            'last_checked': now
         }
         logger.info(f"Registered callback for session ID: {session_id}")
         
@@ -456,7 +478,6 @@ class EmailProcessor:
         if date_str:
             try:
                 # Parse the date string to a datetime object
-                from email.utils import parsedate_to_datetime
                 email_data['date'] = parsedate_to_datetime(date_str)
             except Exception:
                 logger.warning(f"Failed to parse email date: {date_str}")
@@ -508,6 +529,13 @@ class EmailProcessor:
         Returns:
             List of parsed email data dictionaries
         """
+        if threading.current_thread() is not self.monitor_thread:
+            self._wake.set()  # A manual check: end the monitor's IDLE so it frees the connection
+        with self._imap_lock:
+            return self._fetch_recent_venmo_emails(limit)
+            
+    def _fetch_recent_venmo_emails(self, limit: int) -> List[Dict]:
+        """Fetch recent unread Venmo emails; caller holds the IMAP lock."""
         if not self.is_connected:
             if not self.connect():
                 logger.error("Cannot fetch emails: Not connected to server")
@@ -612,6 +640,100 @@ class EmailProcessor:
             logger.error(f"Error fetching emails: {e}")
             return []
             
+    def wait_for_new_mail(self, timeout: float) -> bool:
+        """
+        Wait until the server reports new mail or the timeout passes.
+        Uses IMAP IDLE when the server supports it, so a payment email wakes the
+        monitor right away; otherwise this just sleeps.
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+            
+        Returns:
+            True if the server signalled new mail, False otherwise
+        """
+        with self._imap_lock:
+            conn = self.imap_conn
+            if self.is_connected and conn is not None and self._idle_supported and "IDLE" in conn.capabilities:
+                try:
+                    return self._idle(conn, timeout)
+                except (imaplib.IMAP4.error, OSError) as e:
+                    # Reconnect on the next check
+                    logger.warning(f"IMAP IDLE failed: {e}")
+                    self._disconnect()
+                    return False
+                finally:
+                    self._wake.clear()
+                    
+        # No IDLE: sleep until the next check (or until woken)
+        self._wake.wait(timeout)
+        self._wake.clear()
+        return False
+        
+    def _idle(self, conn, timeout: float) -> bool:
+        """
+        Run one IMAP IDLE (RFC 2177) cycle; caller holds the IMAP lock.
+        The command is sent under a tag of our own through the public send/readline
+        methods, so imaplib's tag bookkeeping is never touched.
+        """
+        tag = f"IDLE{next(self._idle_tags)}".encode("ascii")
+        conn.send(tag + b" IDLE\r\n")
+        if not conn.readline().startswith(b"+"):
+            # The server refused: that line was the tagged NO/BAD, so the stream is back in sync
+            logger.info("Email server rejected IDLE, falling back to polling")
+            self._idle_supported = False
+            return False
+            
+        new_mail = False
+        deadline = time.monotonic() + timeout
+        while not self._wake.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Check at least once a second whether stop_monitoring or a manual check needs the connection
+            if self._idle_data_ready(conn, min(remaining, 1.0)):
+                line = conn.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("connection closed during IDLE")
+                if line.startswith(b"*") and (b"EXISTS" in line or b"RECENT" in line):
+                    new_mail = True
+                    break
+                    
+        # End IDLE and read through to its tagged completion
+        conn.send(b"DONE\r\n")
+        while True:
+            line = conn.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed ending IDLE")
+            if line.startswith(tag + b" "):
+                return new_mail
+
+    @staticmethod
+    def _idle_data_ready(conn, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for IDLE response data from the server.
+        Data already read off the socket doesn't make it select() readable: it can sit
+        decrypted in the TLS layer or in the buffered file imaplib reads lines from,
+        so both are checked before waiting on the socket.
+        """
+        sock = conn.sock
+        if isinstance(sock, ssl.SSLSocket) and sock.pending():
+            return True
+        
+        # Peek without blocking: returns what the buffer holds, or nothing if the socket is empty
+        previous_timeout = sock.gettimeout()
+        sock.settimeout(0)
+        try:
+            if conn.file.peek(1):
+                return True
+        except (BlockingIOError, ssl.SSLWantReadError):
+            pass
+        finally:
+            sock.settimeout(previous_timeout)
+            
+        readable, _, _ = select.select([sock], [], [], timeout)
+        return bool(readable)
+            
     def start_monitoring(self, interval_seconds: int = None) -> bool:
         """
         Start monitoring for new Venmo emails in a background thread.
@@ -647,7 +769,7 @@ class EmailProcessor:
                     if not self.is_connected:
                         if not self.connect():
                             logger.error("Email connection lost and reconnection failed")
-                            time.sleep(interval_seconds)
+                            self._wake.wait(interval_seconds)
                             continue
                         
                     # Clean up expired callbacks
@@ -688,8 +810,8 @@ class EmailProcessor:
                     logger.error(f"Error in email monitoring thread: {e}")
                     consecutive_errors += 1
                     
-                # Sleep until the next check
-                time.sleep(interval_seconds)
+                # Wait until the next check, or until the server reports new mail
+                self.wait_for_new_mail(interval_seconds)
                 
             logger.info("Email monitoring thread stopped")
             
@@ -705,6 +827,7 @@ class EmailProcessor:
         if self.monitoring_active:
             logger.info("Stopping email monitoring")
             self.monitoring_active = False
+            self._wake.set()
             
             # Disconnect from the server
             self.disconnect()
@@ -26,10 +26,13 @@ class VenmoQRManager:
         self.last_generated_app = None
         self.payment_callback = None
         self.sessions = {}
+        # (file mtime, base64) of the Venmo QR code, reused until the PNG changes on disk
+        self._qr_code_cache = (None, "")
 
     def set_base_url(self, url: Optional[str]) -> None:
         """Set the Venmo base URL."""
         self.venmo_base_url = url or VENMO_CONFIG.get("venmo_profile_url", "")
+        self._qr_code_cache = (None, "")
 
     def register_payment_callback(self, callback: Callable[[Dict[str, Any]], bool]) -> None:
         """Register a callback function for processing payments."""
@@ -37,11 +40,30 @@ class VenmoQRManager:
 
     def get_venmo_qr_code(self) -> str:
         """Get the Venmo QR code as a base64-encoded string."""
+        # A stat is far cheaper than re-reading and re-encoding the PNG
+        cached_mtime, qr_code = self._qr_code_cache
+        if qr_code and cached_mtime == self._qr_code_mtime():
+            return qr_code
+        qr_code = self._load_venmo_qr_code()
+        # Stat after loading: generating the code writes the file
+        self._qr_code_cache = (self._qr_code_mtime(), qr_code)
+        return qr_code
+
+    def _qr_code_mtime(self) -> Optional[int]:
+        """Modification time of the QR code PNG, or None if it doesn't exist."""
+        try:
+            return os.stat(self.qr_code_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_venmo_qr_code(self) -> str:
+        """Read the Venmo QR code from disk, generating it if the file is missing."""
         try:
-            if os.path.exists(self.qr_code_path):
+            # Open directly instead of checking first; a missing file is the uncommon case
+            try:
                 with open(self.qr_code_path, "rb") as f:
-                    return base64.b64encode(f.read()).decode("utf-8")
-            else:
+                    return base64.b64encode(f.read()).decode("ascii")
+            except FileNotFoundError:
                 # Generate QR code dynamically
                 if self.venmo_base_url:
                     return self.generate_venmo_qr_base64()
@@ -66,18 +88,18 @@ class VenmoQRManager:
             # Save to buffer and encode
             buffer = io.BytesIO()
             img.save(buffer, format="PNG")
-            buffer.seek(0)
+            png_bytes = buffer.getbuffer()  # View of the PNG bytes, no copy
             
             # Save to file for caching
             try:
                 with open(self.qr_code_path, "wb") as f:
-                    f.write(buffer.getvalue())
+                    f.write(png_bytes)
                 logging.info(f"Venmo QR code saved to {self.qr_code_path}")
             except Exception as e:
                 logging.error(f"Error saving Venmo QR code to file: {e}")
             
             # Return base64 encoded string
-            return base64.b64encode(buffer.getvalue()).decode("utf-8")
+            return base64.b64encode(png_bytes).decode("ascii")
         except Exception as e:
             logging.error(f"Error generating Venmo QR code: {e}")
             return ""
@@ -1,4 +1,4 @@
 #!/bin/bash
 cd /home/pi/App-Design-as-a-Commodity
 source venv/bin/activate
-python app.py
+python app.py --production
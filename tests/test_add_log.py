@@ -0,0 +1,31 @@
+"""
+Tests for the add_log helpers in main.py and logging_service.py.
+"""
+import os
+import sys
+
+import pytest
+
+# The application modules import each other relative to the src directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+def test_logging_service_add_log_records_entry():
+    pytest.importorskip("flask")
+    from logging_service import logging_service
+    
+    entry = logging_service.add_log("Payment of $%.2f received", "error", 1.0)
+    
+    assert entry["message"] == "Payment of $1.00 received"
+    assert entry["level"] == "error"
+    assert logging_service.application_logs[-1] is entry
+
+def test_main_add_log_records_entry():
+    for module in ("flask", "dotenv", "escpos", "requests", "google.generativeai"):
+        pytest.importorskip(module)
+    import main
+    
+    entry = main.add_log("Payment of $%.2f received", "error", 1.0)
+    
+    assert entry["message"] == "Payment of $1.00 received"
+    assert entry["level"] == "error"
+    assert main.application_logs[-1] is entry
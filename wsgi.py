@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for serving Vibe Coder with a production server.
+
+Run from the repository root with:
+
+    gunicorn --workers 1 --threads 8 --bind 0.0.0.0:5002 wsgi:app
+
+Keep a single worker process: the generation lock, in-memory logs, last
+payment, email monitor and thermal printer all live in the process, so
+concurrency comes from threads instead of extra workers. The work those
+threads do (Gemini and GitHub requests, IMAP IDLE, USB writes) is I/O that
+releases the GIL. An open /api/email-status/stream holds one thread, so
+raise --threads (GUNICORN_THREADS for app.py) if many screens are connected.
+"""
+import os
+import sys
+
+# main.py imports its helper modules relative to the src directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from main import app, init_venmo_system, init_thermal_printer, print_initial_header
+
+# Same startup sequence as running src/main.py directly
+init_venmo_system()
+init_thermal_printer()
+print_initial_header()